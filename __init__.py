@@ -61,6 +61,7 @@ class CatalogOTFPlugin:
 
   def _connect(self, isConnect = True):
     signal_slot = (
+      { 'signal': QgsProject.instance().layerLoaded, 'slot': self.projOTF.onLayerLoaded },
       { 'signal': QgsProject.instance().readProject, 'slot': self.projOTF.onReadProject },
       { 'signal': QgsProject.instance().writeProject, 'slot': self.projOTF.onWriteProject }
     )
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Cache descriptors
+Description          : Parsed GDAL_WMS descriptors (service and TargetWindow) by path and mtime
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+
+class CacheDescriptors(object):
+  """
+  Shared by the legend actions (main thread) and the worker (download), each file is parsed once.
+  Descriptor is dictionary with 'service' (name of service, e.g. 'TMS', 'WMS') and
+  'targetWindow' (ulX, ulY, lrX, lrY) or None. Files that are not GDAL_WMS have descriptor None.
+  """
+
+  # Static
+  EXT_DATA = ".xml"
+  MAX_ITEMS = 20000
+  items = OrderedDict() # path: ( mtime, descriptor ), least recently used first
+  lock = threading.Lock()
+
+  @staticmethod
+  def parse(root):
+    """ root: Element of XML """
+    if root.tag != 'GDAL_WMS':
+      return None
+    service = root.find( 'Service' )
+    descriptor = {
+      'service': None if service is None else service.get( 'name' ),
+      'targetWindow': None
+    }
+    node = root.find( './/TargetWindow' )
+    if node is None:
+      return descriptor
+    try:
+      keys = ( 'UpperLeftX', 'UpperLeftY', 'LowerRightX', 'LowerRightY' )
+      descriptor['targetWindow'] = tuple( map( lambda key: float( node.find( key ).text ), keys ) )
+    except ( AttributeError, TypeError, ValueError ): # Missing or empty
+      pass
+    return descriptor
+
+  @staticmethod
+  def _store(path, mtime, descriptor):
+    with CacheDescriptors.lock:
+      items = CacheDescriptors.items
+      if path in items:
+        del items[ path ]
+      items[ path ] = ( mtime, descriptor )
+      while len( items ) > CacheDescriptors.MAX_ITEMS:
+        items.popitem( last=False )
+
+  @staticmethod
+  def put(path, root):
+    """ Called when the file was written (download), root: Element of XML """
+    try:
+      mtime = os.stat( path ).st_mtime
+    except OSError:
+      return
+    CacheDescriptors._store( path, mtime, CacheDescriptors.parse( root ) )
+
+  @staticmethod
+  def get(path):
+    """ Return the descriptor, the file is parsed only when not in cache or changed """
+    if not path.lower().endswith( CacheDescriptors.EXT_DATA ):
+      return None
+    try:
+      mtime = os.stat( path ).st_mtime
+    except OSError:
+      return None
+    with CacheDescriptors.lock:
+      items = CacheDescriptors.items
+      item = items.pop( path, None )
+      if not item is None and item[0] == mtime:
+        items[ path ] = item # Most recently used
+        return item[1]
+    try:
+      descriptor = CacheDescriptors.parse( ElementTree.parse( path ).getroot() )
+    except ( IOError, ElementTree.ParseError ):
+      descriptor = None
+    CacheDescriptors._store( path, mtime, descriptor )
+    return descriptor
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Cache sources
+Description          : Cache in disk of remote XML sources (GDAL_WMS/TMS)
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from os.path import ( join as joinPath, isdir, getsize, getatime )
+from xml.etree import ElementTree
+
+
+class CacheSources(object):
+  """
+  Files are named by hash of url, then the same directory can be shared between sessions and users.
+  Each file has a sidecar with url, ETag, Last-Modified and time of download.
+  """
+
+  # Static
+  NAME_DIR = "catalogotf_cache"
+  EXT_DATA = ".xml"
+  EXT_META = ".json"
+  PREFIX_TEMP = ".tmp_"
+
+  def __init__(self, dirCache=None, ttl=86400, sizeMax=200 * 1024 * 1024):
+    """ ttl: seconds before revalidate with server, sizeMax: bytes of files in cache """
+    self.dirCache = self.getDirDefault() if dirCache is None else dirCache
+    ( self.ttl, self.sizeMax ) = ( ttl, sizeMax )
+    self.modeFile = self.getModeFile()
+    self.lock = threading.Lock()
+    self.resetCounters()
+
+  @staticmethod
+  def getDirDefault():
+    return joinPath( tempfile.gettempdir(), CacheSources.NAME_DIR )
+
+  @staticmethod
+  def getModeFile():
+    # Mode of a file created by open (mkstemp creates with 0600), os.umask is only read by setting it
+    umask = os.umask( 0 )
+    os.umask( umask )
+    return 0666 & ~umask
+
+  def resetCounters(self):
+    with self.lock:
+      self.counters = { 'hits': 0, 'misses': 0, 'revalidated': 0, 'evicted': 0 }
+
+  def _count(self, key, value=1):
+    with self.lock:
+      self.counters[ key ] += value
+
+  def _getKey(self, url):
+    return hashlib.sha1( url.encode( 'utf-8' ) if isinstance( url, unicode ) else url ).hexdigest()
+
+  def localName(self, url):
+    return joinPath( self.dirCache, "%s%s" % ( self._getKey( url ), self.EXT_DATA ) )
+
+  def _metaName(self, url):
+    return joinPath( self.dirCache, "%s%s" % ( self._getKey( url ), self.EXT_META ) )
+
+  def _readMeta(self, url):
+    try:
+      with open( self._metaName( url ), 'r' ) as fr:
+        return json.load( fr )
+    except ( IOError, ValueError ):
+      return None
+
+  def _writeAtomic(self, name, content):
+    ( fd, nameTemp ) = tempfile.mkstemp( prefix=self.PREFIX_TEMP, dir=self.dirCache )
+    try:
+      with os.fdopen( fd, 'wb' ) as fw:
+        fw.write( content )
+      os.chmod( nameTemp, self.modeFile ) # Directory shared between sessions and users
+      try:
+        os.rename( nameTemp, name )
+      except OSError: # Windows not replace existing file
+        os.remove( name )
+        os.rename( nameTemp, name )
+    except:
+      if os.path.exists( nameTemp ):
+        os.remove( nameTemp )
+      raise
+
+  def _touch(self, name):
+    # Access time is the order of eviction, modification time is kept
+    try:
+      os.utime( name, ( time.time(), os.stat( name ).st_mtime ) )
+    except OSError:
+      pass
+
+  def exists(self, url):
+    return os.path.isfile( self.localName( url ) )
+
+  def lookup(self, url):
+    """ Return True if the file is in cache and not expired (count hit or miss) """
+    name = self.localName( url )
+    meta = self._readMeta( url )
+    if meta is None or not os.path.isfile( name ) or time.time() - meta.get( 'fetched', 0 ) > self.ttl:
+      self._count( 'misses' )
+      return False
+    self._touch( name )
+    self._count( 'hits' )
+    return True
+
+  def headersRevalidate(self, url):
+    """ Headers of conditional request for file in cache (None if not in cache) """
+    meta = self._readMeta( url )
+    if meta is None or not self.exists( url ):
+      return None
+    headers = {}
+    if not meta.get( 'etag' ) is None:
+      headers['If-None-Match'] = meta['etag']
+    if not meta.get( 'lastModified' ) is None:
+      headers['If-Modified-Since'] = meta['lastModified']
+    return headers
+
+  def put(self, url, result, parsed=None):
+    """
+    result: dictionary from FetchSources.fetch
+    parsed: function(localName, root) called with the XML written, can be None
+    Return False if the content is not a valid XML
+    """
+    if not isdir( self.dirCache ):
+      os.makedirs( self.dirCache )
+
+    meta = self._readMeta( url ) if result['status'] == 304 else None
+    if meta is None:
+      data = result['data']
+      try:
+        root = ElementTree.fromstring( data )
+      except ( ElementTree.ParseError, ValueError ):
+        return False
+      self._writeAtomic( self.localName( url ), data )
+      if not parsed is None:
+        parsed( self.localName( url ), root )
+      meta = { 'url': url }
+    else:
+      self._count( 'revalidated' )
+    headers = result['headers']
+    meta['etag'] = headers.get( 'etag', meta.get( 'etag' ) )
+    meta['lastModified'] = headers.get( 'last-modified', meta.get( 'lastModified' ) )
+    meta['fetched'] = time.time()
+    self._writeAtomic( self._metaName( url ), json.dumps( meta ) )
+    return True
+
+  def evict(self, keep=()):
+    """ Remove the files least recently used until size of cache is lower than sizeMax """
+    if not isdir( self.dirCache ):
+      return
+    keep = set( keep )
+    items = []
+    sizeTotal = 0
+    for name in os.listdir( self.dirCache ):
+      path = joinPath( self.dirCache, name )
+      try:
+        if name.startswith( self.PREFIX_TEMP ): # Left by crash
+          if time.time() - getatime( path ) > 3600:
+            os.remove( path )
+          continue
+        if not name.endswith( self.EXT_DATA ):
+          continue
+        size = getsize( path )
+        sizeTotal += size
+        if not path in keep:
+          items.append( ( getatime( path ), size, path ) )
+      except OSError: # Removed by other session
+        continue
+    if sizeTotal <= self.sizeMax:
+      return
+
+    items.sort()
+    for ( atime, size, path ) in items:
+      if sizeTotal <= self.sizeMax:
+        break
+      try:
+        os.remove( path )
+        os.remove( "%s%s" % ( path[ : -len( self.EXT_DATA ) ], self.EXT_META ) )
+      except OSError:
+        pass
+      sizeTotal -= size
+      self._count( 'evicted' )
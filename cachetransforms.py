@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Cache transforms
+Description          : Coordinate transforms and reprojected extents reused between searches and legend actions
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import threading
+
+from qgis.core import ( QgsCoordinateTransform, QgsRectangle )
+
+
+class CacheTransforms(object):
+  """
+  Transforms are kept by thread (PROJ objects are not shared between threads).
+  Extents are kept by layer, destination CRS and rectangle, then a change of CRS or extent is other entry.
+  The entries of old CRS are not used again, the dock clears them when the CRS of canvas changes.
+  """
+
+  # Static
+  MAX_EXTENTS = 5000
+  local = threading.local()
+  extents = {} # ( layerID, key of CRS, rectangle ): QgsRectangle
+  lock = threading.Lock()
+
+  @staticmethod
+  def getKey(crs):
+    authid = crs.authid()
+    return authid if authid != '' else crs.toWkt()
+
+  @staticmethod
+  def getTransform(crsSrc, crsDst):
+    if not hasattr( CacheTransforms.local, 'transforms' ):
+      CacheTransforms.local.transforms = {}
+    transforms = CacheTransforms.local.transforms
+    key = ( CacheTransforms.getKey( crsSrc ), CacheTransforms.getKey( crsDst ) )
+    if not key in transforms:
+      transforms[ key ] = QgsCoordinateTransform( crsSrc, crsDst )
+    return transforms[ key ]
+
+  @staticmethod
+  def getExtent(layer, crsDst, rect=None):
+    """ Extent of layer (or rect in CRS of layer) in crsDst """
+    if rect is None:
+      rect = layer.extent()
+    key = ( layer.id(), CacheTransforms.getKey( crsDst ), rect.toString( 12 ) )
+    with CacheTransforms.lock:
+      extent = CacheTransforms.extents.get( key )
+    if extent is None:
+      crsLayer = layer.crs()
+      if CacheTransforms.getKey( crsLayer ) == key[1]:
+        extent = QgsRectangle( rect )
+      else:
+        extent = CacheTransforms.getTransform( crsLayer, crsDst ).transform( rect )
+      with CacheTransforms.lock:
+        if len( CacheTransforms.extents ) >= CacheTransforms.MAX_EXTENTS:
+          CacheTransforms.extents.clear()
+        CacheTransforms.extents[ key ] = extent
+    return QgsRectangle( extent )
+
+  @staticmethod
+  def clearExtents():
+    with CacheTransforms.lock:
+      CacheTransforms.extents.clear()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Catalog arrays
+Description          : Bounding boxes, fids, dates and sources of catalog layer in NumPy arrays
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from PyQt4.QtCore import ( QMutexLocker, QDate, QDateTime, QPyNullVariant )
+
+from qgis.core import ( QgsFeature, QgsFeatureRequest, QgsRectangle )
+
+from cataloglayer import CatalogLayer
+
+
+class CatalogArrays(CatalogLayer):
+  """
+  Engine of search alternative to CatalogIndex, extent and dates are compared by vectorized operations.
+  Any change in layer invalidates the arrays, they are built again by next search.
+  """
+
+  # Static
+  STEP_KILLED = 1000 # Features between check of killed
+
+  def __init__(self):
+    super(CatalogArrays, self).__init__()
+    self.arrays = self.nameFieldSource = self.nameFieldDate = None
+
+  @staticmethod
+  def isAvailable():
+    return not numpy is None
+
+  def getSignalsLayer(self):
+    return [
+      { 'signal': self.layer.featureAdded, 'slot': self.invalidate },
+      { 'signal': self.layer.featureDeleted, 'slot': self.invalidate },
+      { 'signal': self.layer.geometryChanged, 'slot': self.invalidate },
+      { 'signal': self.layer.attributeValueChanged, 'slot': self.invalidate },
+      { 'signal': self.layer.dataChanged, 'slot': self.invalidate }
+    ]
+
+  def _clear(self):
+    self.arrays = None
+
+  def setLayer(self, layer, nameFieldSource, nameFieldDate):
+    ( self.nameFieldSource, self.nameFieldDate ) = ( nameFieldSource, nameFieldDate )
+    super(CatalogArrays, self).setLayer( layer )
+
+  def isBuilt(self):
+    locker = QMutexLocker( self.mutex )
+    return not self.arrays is None
+
+  @staticmethod
+  def getDateString( value ):
+    if value is None or type( value ) == QPyNullVariant:
+      return ''
+    return value.toString( "yyyy-MM-dd" ) if type( value ) in ( QDate, QDateTime ) else value
+
+  def build(self, isKilled):
+    """ Arrays of all features, see CatalogLayer._build """
+    def populate():
+      ( l_bbox, l_fid, l_source, l_date ) = ( [], [], [], [] )
+      fr = QgsFeatureRequest()
+      names = [ self.nameFieldSource ] if self.nameFieldDate is None else [ self.nameFieldSource, self.nameFieldDate ]
+      fr.setSubsetOfAttributes( map( self.layer.fieldNameIndex, names ) )
+      it = self.layer.getFeatures( fr )
+      f = QgsFeature()
+      step = 0
+      while it.nextFeature( f ):
+        geom = f.geometry()
+        if geom is None:
+          continue
+        bbox = geom.boundingBox()
+        l_bbox.append( ( bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum() ) )
+        l_fid.append( f.id() )
+        l_source.append( f[ self.nameFieldSource ] )
+        if not self.nameFieldDate is None:
+          l_date.append( self.getDateString( f[ self.nameFieldDate ] ) )
+        step += 1
+        if step == self.STEP_KILLED:
+          step = 0
+          if isKilled():
+            it.close()
+            return None
+      it.close()
+
+      bbox = numpy.array( l_bbox, dtype=numpy.float64 ).reshape( -1, 4 )
+      arrays = {
+        'xmin': bbox[:, 0], 'ymin': bbox[:, 1], 'xmax': bbox[:, 2], 'ymax': bbox[:, 3],
+        'fid': numpy.array( l_fid, dtype=numpy.int64 ),
+        'source': l_source,
+        'date': None if self.nameFieldDate is None else numpy.array( l_date, dtype=unicode )
+      }
+      del l_bbox[:]
+      del l_fid[:]
+      del l_date[:]
+      return arrays
+
+    def store( arrays ):
+      self.arrays = arrays
+
+    return self._build( populate, store )
+
+  def query(self, rect, dateFrom=None, dateTo=None, fidsFilter=None):
+    """
+    Return list of dictionary with fid, source, date, bbox (QgsRectangle) and inside.
+    inside is True when the bounding box is inside of rect, then the footprint intersects without test of geometry.
+    dateFrom, dateTo: strings 'yyyy-MM-dd' or None
+    """
+    locker = QMutexLocker( self.mutex )
+    a = self.arrays
+    if a is None:
+      return []
+    ( xmin, ymin, xmax, ymax ) = ( rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum() )
+    mask = ( a['xmax'] >= xmin ) & ( a['xmin'] <= xmax ) & ( a['ymax'] >= ymin ) & ( a['ymin'] <= ymax )
+    if not a['date'] is None:
+      if not dateFrom is None:
+        mask &= a['date'] >= dateFrom
+      if not dateTo is None:
+        mask &= a['date'] <= dateTo
+    if not fidsFilter is None:
+      mask &= numpy.in1d( a['fid'], numpy.array( list( fidsFilter ), dtype=numpy.int64 ) )
+    inside = ( a['xmin'] >= xmin ) & ( a['xmax'] <= xmax ) & ( a['ymin'] >= ymin ) & ( a['ymax'] <= ymax )
+
+    items = []
+    for id in numpy.nonzero( mask )[0]:
+      item = {
+        'fid': int( a['fid'][ id ] ),
+        'source': a['source'][ id ],
+        'bbox': QgsRectangle( a['xmin'][ id ], a['ymin'][ id ], a['xmax'][ id ], a['ymax'][ id ] ),
+        'inside': bool( inside[ id ] )
+      }
+      if not a['date'] is None:
+        item['date'] = a['date'][ id ]
+      items.append( item )
+    return items
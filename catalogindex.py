@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Catalog index
+Description          : Spatial index of catalog layer kept up to date by signals of layer
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from PyQt4.QtCore import ( QMutexLocker, pyqtSlot )
+
+from qgis.core import ( QgsFeature, QgsFeatureRequest, QgsGeometry, QgsRectangle, QgsSpatialIndex )
+
+from cataloglayer import CatalogLayer
+
+
+class CatalogIndex(CatalogLayer):
+
+  # Static
+  STEP_KILLED = 1000 # Features between check of killed
+
+  def __init__(self):
+    super(CatalogIndex, self).__init__()
+    self.index = None
+    self.bboxes = {} # fid: QgsRectangle
+
+  def getSignalsLayer(self):
+    # Index is updated by feature, other changes build it again
+    return [
+      { 'signal': self.layer.featureAdded, 'slot': self.featureAdded },
+      { 'signal': self.layer.featureDeleted, 'slot': self.featureDeleted },
+      { 'signal': self.layer.geometryChanged, 'slot': self.geometryChanged },
+      { 'signal': self.layer.dataChanged, 'slot': self.invalidate }
+    ]
+
+  def _clear(self):
+    self.index = None
+    self.bboxes = {}
+
+  def isBuilt(self):
+    locker = QMutexLocker( self.mutex )
+    return not self.index is None
+
+  def build(self, isKilled):
+    """ Spatial index and bounding boxes of all features, see CatalogLayer._build """
+    def populate():
+      index = QgsSpatialIndex()
+      bboxes = {}
+      fr = QgsFeatureRequest()
+      fr.setSubsetOfAttributes( [] )
+      it = self.layer.getFeatures( fr )
+      f = QgsFeature()
+      step = 0
+      while it.nextFeature( f ):
+        geom = f.geometry()
+        if geom is None:
+          continue
+        bboxes[ f.id() ] = geom.boundingBox()
+        index.insertFeature( f )
+        step += 1
+        if step == self.STEP_KILLED:
+          step = 0
+          if isKilled():
+            it.close()
+            return None
+      it.close()
+      return ( index, bboxes )
+
+    def store( data ):
+      ( self.index, self.bboxes ) = data
+
+    return self._build( populate, store )
+
+  def intersects(self, rect, fidsFilter=None):
+    locker = QMutexLocker( self.mutex )
+    if self.index is None:
+      return []
+    fids = self.index.intersects( rect )
+    if not fidsFilter is None:
+      fidsFilter = set( fidsFilter )
+      fids = filter( lambda fid: fid in fidsFilter, fids )
+    return fids
+
+  def getBBoxes(self, fids):
+    """ Return dictionary fid: bounding box """
+    locker = QMutexLocker( self.mutex )
+    return dict( ( fid, QgsRectangle( self.bboxes[ fid ] ) ) for fid in fids if fid in self.bboxes )
+
+  def _insert(self, fid, geom):
+    if geom is None:
+      return
+    f = QgsFeature( fid )
+    f.setGeometry( QgsGeometry( geom ) )
+    self.index.insertFeature( f )
+    self.bboxes[ fid ] = geom.boundingBox()
+
+  def _delete(self, fid):
+    if not fid in self.bboxes:
+      return
+    f = QgsFeature( fid )
+    f.setGeometry( QgsGeometry.fromRect( self.bboxes[ fid ] ) )
+    self.index.deleteFeature( f )
+    del self.bboxes[ fid ]
+
+  @pyqtSlot( 'qint64' )
+  def featureAdded(self, fid):
+    locker = QMutexLocker( self.mutex )
+    self.generation += 1
+    if self.index is None:
+      return
+    f = QgsFeature()
+    fr = QgsFeatureRequest( fid )
+    fr.setSubsetOfAttributes( [] )
+    if self.layer.getFeatures( fr ).nextFeature( f ):
+      self._insert( fid, f.geometry() )
+
+  @pyqtSlot( 'qint64' )
+  def featureDeleted(self, fid):
+    locker = QMutexLocker( self.mutex )
+    self.generation += 1
+    if self.index is None:
+      return
+    self._delete( fid )
+
+  @pyqtSlot( 'qint64', 'QgsGeometry' )
+  def geometryChanged(self, fid, geom):
+    locker = QMutexLocker( self.mutex )
+    self.generation += 1
+    if self.index is None:
+      return
+    self._delete( fid )
+    self._insert( fid, geom )
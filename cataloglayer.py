@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Catalog layer
+Description          : Base of data of catalog layer kept by signals of layer (index, arrays and results)
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from PyQt4.QtCore import ( QObject, QMutex, QMutexLocker, pyqtSlot )
+
+
+class CatalogLayer(QObject):
+  """
+  The data is read by worker thread and changed by signals of layer in main thread (protected by mutex).
+  Any signal changes the generation, data built or searched with a previous generation is discarded.
+  Subclasses implement getSignalsLayer and _clear.
+  """
+
+  def __init__(self):
+    super(CatalogLayer, self).__init__()
+    self.mutex = QMutex()
+    self.layer = None
+    self.generation = 0
+
+  def getSignalsLayer(self):
+    """ Return list of dictionary with signal of layer and slot """
+    raise NotImplementedError
+
+  def _clear(self):
+    """ Remove the data, called with mutex locked """
+    raise NotImplementedError
+
+  def _connect(self, isConnect = True):
+    ss = self.getSignalsLayer()
+    if isConnect:
+      for item in ss:
+        item['signal'].connect( item['slot'] )
+    else:
+      for item in ss:
+        item['signal'].disconnect( item['slot'] )
+
+  def setLayer(self, layer):
+    if not self.layer is None:
+      self.removeLayer()
+    self.layer = layer
+    self._connect()
+    self.invalidate()
+
+  def removeLayer(self):
+    if self.layer is None:
+      return
+    self._connect( False )
+    self.invalidate()
+    self.layer = None
+
+  def getGeneration(self):
+    locker = QMutexLocker( self.mutex )
+    return self.generation
+
+  def _build(self, populate, store):
+    """
+    Run in worker thread, return False if killed.
+    populate: function return the data (None if killed), called again if the layer changed during the build
+    store: function(data) called with mutex locked
+    """
+    while True:
+      generation = self.getGeneration()
+      data = populate()
+      if data is None:
+        return False
+
+      locker = QMutexLocker( self.mutex )
+      if generation == self.generation:
+        store( data )
+        return True
+
+  @pyqtSlot()
+  def invalidate(self):
+    locker = QMutexLocker( self.mutex )
+    self.generation += 1
+    self._clear()
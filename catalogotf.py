@@ -19,22 +19,25 @@ email                : motta.luiz@gmail.com
  ***************************************************************************/
 """
 
-import urllib2
+import time
+import threading
 from datetime import datetime
-from os.path import ( basename, dirname, sep as sepPath, isdir, join as joinPath )
-from os import makedirs
+from multiprocessing.pool import ThreadPool
+from os.path import ( dirname, sep as sepPath, join as joinPath )
 
 import json
 
 from PyQt4.QtCore import ( 
-     Qt, QObject, QThread, QFileInfo, QDir, QVariant, QDate, QCoreApplication,
+     Qt, QObject, QThread, QThreadPool, QRunnable, QTimer, QSettings, QSize, QEvent, QModelIndex, QAbstractTableModel, QFileInfo, QDir, QVariant, QDate, QDateTime, QCoreApplication,
      QPyNullVariant, pyqtSignal, pyqtSlot
 )
 from PyQt4.QtGui  import (
      QAction,
-     QApplication,  QCursor, QColor, QIcon,
-     QTableWidget, QTableWidgetItem,
-     QPushButton, QGridLayout, QProgressBar, QDockWidget, QWidget
+     QApplication, QColor, QIcon,
+     QTableView, QAbstractItemView, QSortFilterProxyModel, QStyledItemDelegate,
+     QStyle, QStyleOptionButton, QStyleOptionProgressBar, QLineEdit, QVBoxLayout,
+     QPushButton, QLabel, QGridLayout, QDockWidget, QWidget,
+     QDialog, QDialogButtonBox, QFormLayout, QCheckBox, QDateEdit, QSpinBox, QComboBox
 )
 from PyQt4.QtXml import QDomDocument
 
@@ -43,44 +46,136 @@ from qgis.gui import ( QgsMessageBar )
 from qgis.core import (
   QgsProject, QGis, QgsMessageLog,
   QgsMapLayerRegistry, QgsMapLayer,
-  QgsFeature, QgsFeatureRequest, QgsGeometry, QgsRectangle,  QgsSpatialIndex,
-  QgsCoordinateTransform,
+  QgsFeature, QgsFeatureRequest, QgsGeometry, QgsRectangle, QgsPoint, QgsSpatialIndex,
   QgsRasterLayer, QgsRasterTransparency,
-  QgsLayerTreeNode
+  QgsLayerTreeNode, QgsLayerTreeLayer, QgsLayerTreeGroup
 )
 
 from legendlayer import ( LegendRaster, LegendTMS )
-from sortedlistbythread import SortedListByThread
+from catalogindex import CatalogIndex
+from catalogarrays import CatalogArrays
+from catalogresults import CatalogResults
+from sortedlist import SortedList
+from fetchsources import FetchSources
+from cachesources import CacheSources
+from cachedescriptors import CacheDescriptors
+from cachetransforms import CacheTransforms
+from projectdescriptors import ProjectDescriptors
 from PyQt4.Qt import QDate
 
 NAME_PLUGIN = "Catalog On The Fly"
+KEY_SOURCE_CATALOG = "catalogotf/source" # Custom property of layer in catalog group
+KEY_PLACEHOLDER_CATALOG = "catalogotf/placeholder" # Custom property of group in place of layer (file of image)
 
 class WorkerPopulateGroup(QObject):
 
   # Static
-  TEMP_DIR = "/tmp"
+  KEY_SETTINGS = "catalogotf/cache"
+  FETCH_WORKERS = 8
+  FETCH_TIMEOUT_CONNECT = 5 # Seconds
+  FETCH_TIMEOUT_READ = 30 # Seconds
+  OPEN_WORKERS = 4
+  OPEN_SLOW = 1.0 # Seconds
+  STEP_KILLED = 1000 # Features between check of killed
+  FOOTPRINT_OVERLAP = 0.8 # Images with same footprint (intersection over union)
+  DENSIFY_EDGE = 16 # Points by edge of canvas for reproject
+  STEP_BATCH = 500 # Features by request
+  PROVIDERS_PUSHDOWN = ( 'postgres', 'spatialite', 'mssql', 'oracle' ) # Filters done by database
+  COVERAGE_TOLERANCE = 0.001 # Fraction of area of footprint, smaller uncovered area is noise of geometry
+  
+  CHUNK_IMAGES = 50 # Images by delivery to main thread
+  CHUNK_INTERVAL = 0.5 # Seconds, maximum wait of images opened before delivery
+  PROGRESS_INTERVAL = 0.2 # Seconds between signals of progress
   
   # Signals 
   finished = pyqtSignal( bool )
   messageStatus = pyqtSignal( str )
   messageError = pyqtSignal( str )
+  progress = pyqtSignal( str, int, int, int ) # phase ('download', 'open'), done, total, bytes
+  startedDelivery = pyqtSignal( list, list ) # Sources of result (sorted), sources removed from catalog group
+  deliveredImages = pyqtSignal( list ) # Chunk of images: source, name, layer or placeholder
+  fetchedPlaceholders = pyqtSignal( list ) # Sources of placeholders downloaded again (see setFetch)
+  statistics = pyqtSignal( dict ) # found, loaded, errors, hits (cache), duration (seconds)
 
-  def __init__(self, addLegendLayer):
+  def __init__(self):
     
     super(WorkerPopulateGroup, self).__init__()
-    self.addLegendLayer = addLegendLayer
 
-    self.sortedImages = SortedListByThread()
+    self.sortedImages = SortedList()
+    self.fetchSources = FetchSources( self.FETCH_WORKERS, self.FETCH_TIMEOUT_CONNECT, self.FETCH_TIMEOUT_READ )
+    self.cacheSources = WorkerPopulateGroup.getCacheSources()
     self.killed = False
-    self.canvas = qgis.utils.iface.mapCanvas()
     self.logMessage = QgsMessageLog.instance().logMessage
-    self.nameFieldSource = self.layer = self.ltgCatalog = None
+    self.nameFieldSource = self.layer = self.catalogIndex = self.catalogArrays = self.catalogResults = None
+    self.engine = 'index'
+    self.extentCanvas = self.crsCanvas = self.sourcesCatalog = self.filesInUse = self.lazyTop = None
+    self.dateFrom = self.dateTo = self.limitImages = None
+    self.latestByFootprint = self.exactCanvas = self.visibleCoverage = False
+    self.polygonCanvas = None
+    self.sourcesFetch = [] # TMS of placeholders removed from cache
+    self.hasSearch = False
+    self.timeRun = 0.0
+
+  @staticmethod
+  def getCacheSources():
+    # The operators can share the directory of cache between sessions
+    settings = QSettings()
+    dirCache = settings.value( "%s/dir" % WorkerPopulateGroup.KEY_SETTINGS, CacheSources.getDirDefault() )
+    ttl = settings.value( "%s/ttl" % WorkerPopulateGroup.KEY_SETTINGS, 86400, type=int ) # Seconds
+    sizeMax = settings.value( "%s/size_max" % WorkerPopulateGroup.KEY_SETTINGS, 200, type=int ) # MB
+    return CacheSources( dirCache, ttl, sizeMax * 1024 * 1024 )
+
+  @staticmethod
+  def isCacheResults():
+    return QSettings().value( "%s/results" % WorkerPopulateGroup.KEY_SETTINGS, True, type=bool )
+
+  @staticmethod
+  def isUrlTMS( source ):
+    isUrl = source.find('http://') == 0 or source.find('https://') == 0
+    lenSource = len( source)
+    return isUrl and source.rfind( 'xml', lenSource - len( 'xml' ) ) == lenSource - len( 'xml' )   
+
+  @staticmethod
+  def setTransparence( layer ):
+    # Black is transparent for images, except GDAL_WMS
+    extension = ".xml"
+    fileName = QFileInfo( layer.source() ).fileName()
+    idExt = fileName.rfind( extension )
+    if idExt == -1 or len( fileName ) != ( idExt + len ( extension ) ):
+      t = QgsRasterTransparency.TransparentThreeValuePixel()
+      t.red = t.green = t.blue = 0.0
+      t.percentTransparent = 100.0
+      layer.renderer().rasterTransparency().setTransparentThreeValuePixelList( [ t ] )
 
   def setData(self, data):
+    self.hasSearch = True
     self.nameFieldSource = data[ 'nameFieldSource' ]
     self.nameFieldDate = data[ 'nameFieldDate' ]
     self.layer = data[ 'layer' ]
-    self.ltgCatalog = data[ 'ltgCatalog' ]
+    self.catalogIndex = data[ 'catalogIndex' ]
+    self.catalogArrays = data[ 'catalogArrays' ]
+    self.catalogResults = data[ 'catalogResults' ]
+    self.engine = data[ 'engine' ]
+    self.extentCanvas = data[ 'extentCanvas' ]
+    self.lazyTop = data[ 'lazyTop' ]
+    self.dateFrom = data[ 'dateFrom' ]
+    self.dateTo = data[ 'dateTo' ]
+    self.limitImages = data[ 'limitImages' ]
+    self.latestByFootprint = data[ 'latestByFootprint' ]
+    self.exactCanvas = data[ 'exactCanvas' ]
+    self.visibleCoverage = data[ 'visibleCoverage' ]
+    self.polygonCanvas = data[ 'polygonCanvas' ]
+    self.crsCanvas = data[ 'crsCanvas' ]
+
+  def setFetch(self, sources):
+    # Download by next run, before the search if it is requested too
+    self.sourcesFetch = sources
+
+  def setSourcesCatalog(self, sourcesCatalog, filesInUse):
+    # Snapshot of catalog group when the search leaves the queue (see SchedulerCatalogOTF)
+    # filesInUse: files of layers and placeholders in project, never evicted from cache
+    self.sourcesCatalog = sourcesCatalog
+    self.filesInUse = filesInUse
 
   @pyqtSlot()
   def run(self):
@@ -92,39 +187,376 @@ class WorkerPopulateGroup(QObject):
       def getSource(feat):
         return { 'source': feat[ self.nameFieldSource ] }
 
+      def getDateString( value ):
+        return value.toString( "yyyy-MM-dd" ) if type( value ) in ( QDate, QDateTime ) else value
+
+      def getExpressionDate():
+        l_exp = []
+        if not self.dateFrom is None:
+          l_exp.append( "\"%s\" >= '%s'" % ( self.nameFieldDate, getDateString( self.dateFrom ) ) )
+        if not self.dateTo is None:
+          l_exp.append( "\"%s\" <= '%s'" % ( self.nameFieldDate, getDateString( self.dateTo ) ) )
+        return None if len( l_exp ) == 0 else " AND ".join( l_exp )
+
+      def isDateInRange( image ):
+        # Also checked by Python, some versions of QGIS not combine filter of rectangle and expression
+        if not image.has_key( 'date' ) or image['date'] is None or type( image['date'] ) == QPyNullVariant:
+          return self.dateFrom is None and self.dateTo is None
+        value = getDateString( image['date'] )
+        if not self.dateFrom is None and value < getDateString( self.dateFrom ):
+          return False
+        if not self.dateTo is None and value > getDateString( self.dateTo ):
+          return False
+        return True
+
+      def getAttributes():
+        names = [ self.nameFieldSource ] if self.nameFieldDate is None else [ self.nameFieldSource, self.nameFieldDate ]
+        return map( self.layer.fieldNameIndex, names )
+
+      def populateImages( fr, isIntersects ):
+        fidsSelected = set( self.layer.selectedFeaturesIds() ) if selectedImage else None
+        hasDateRange = not ( self.dateFrom is None and self.dateTo is None )
+        getF = getSourceDate if not self.nameFieldDate  is None else  getSource
+        it = self.layer.getFeatures( fr ) 
+        f = QgsFeature()
+        step = 0
+        while it.nextFeature( f ):
+          step += 1
+          if step == self.STEP_KILLED:
+            step = 0
+            if self.isKilled:
+              break
+          if not fidsSelected is None and not f.id() in fidsSelected:
+            continue
+          if not isIntersects( f ):
+            continue
+          image = getF( f )
+          image['fid'] = f.id()
+          if hasDateRange and not isDateInRange( image ):
+            continue
+          if self.latestByFootprint:
+            image['bbox'] = f.geometry().boundingBox()
+          images.append( image )
+        it.close()
+
+      def getOverlap( rect1, rect2 ):
+        # Intersection over union
+        area = lambda rect: rect.width() * rect.height()
+        if not rect1.intersects( rect2 ):
+          return 0.0
+        areaIntersect = area( rect1.intersect( rect2 ) )
+        areaUnion = area( rect1 ) + area( rect2 ) - areaIntersect
+        return 1.0 if areaUnion == 0.0 else areaIntersect / areaUnion
+
+      def getLatestByFootprint( l_sorted ):
+        # Footprints are the same when overlap most of the area, keep the first (newest)
+        index = QgsSpatialIndex()
+        bboxes = []
+        l_latest = []
+        for image in l_sorted:
+          bbox = image['bbox']
+          if any( getOverlap( bbox, bboxes[ id ] ) >= self.FOOTPRINT_OVERLAP for id in index.intersects( bbox ) ):
+            continue
+          f = QgsFeature( len( bboxes ) )
+          f.setGeometry( QgsGeometry.fromRect( bbox ) )
+          index.insertFeature( f )
+          bboxes.append( bbox )
+          l_latest.append( image )
+        return l_latest
+
+      def getFootprints( fids ):
+        footprints = {}
+        f = QgsFeature()
+        for id in xrange( 0, len( fids ), self.STEP_BATCH ):
+          if self.isKilled:
+            break
+          fr = QgsFeatureRequest()
+          fr.setFilterFids( fids[ id : id + self.STEP_BATCH ] )
+          fr.setSubsetOfAttributes( [] )
+          it = self.layer.getFeatures( fr )
+          while it.nextFeature( f ):
+            footprints[ f.id() ] = QgsGeometry( f.geometry() )
+          it.close()
+        return footprints
+
+      def getVisibleCoverage( l_sorted ):
+        # Newest images first, images with footprint (inside of canvas) covered by newer images are removed
+        geomView = geomCanvas if self.exactCanvas else QgsGeometry.fromRect( rectCanvas )
+        areaView = geomView.area()
+        footprints = getFootprints( [ image['fid'] for image in l_sorted ] )
+        geomCovered = None
+        l_visible = []
+        for image in l_sorted:
+          if self.isKilled:
+            return None
+          footprint = footprints.get( image['fid'] )
+          if footprint is None:
+            continue
+          footprint = footprint.intersection( geomView )
+          if footprint is None or footprint.isGeosEmpty():
+            continue
+          if not geomCovered is None:
+            uncovered = footprint.difference( geomCovered )
+            if uncovered is None or uncovered.area() <= self.COVERAGE_TOLERANCE * footprint.area():
+              continue
+          geomCovered = footprint if geomCovered is None else geomCovered.combine( footprint )
+          l_visible.append( image )
+          if geomCovered.area() >= ( 1.0 - self.COVERAGE_TOLERANCE ) * areaView: # Canvas covered
+            break
+        footprints.clear()
+        return l_visible
+
+      def selectImages( l_image ):
+        # Most recent images (N and/or by footprint and/or visible), return None if killed
+        key = 'date' if not self.nameFieldDate is None else 'source'
+        f_key = lambda item: item[ key ]
+        isSorted = False
+        if self.latestByFootprint:
+          l_image = self.sortedImages.run( l_image, f_key, True )
+          if l_image is None:
+            return None
+          l_image = getLatestByFootprint( l_image )
+          isSorted = True
+        if not self.limitImages is None:
+          l_image = self.sortedImages.run( l_image, f_key, True, self.limitImages )
+          if l_image is None:
+            return None
+          isSorted = True
+        if self.visibleCoverage:
+          if not isSorted:
+            l_image = self.sortedImages.run( l_image, f_key, True )
+            if l_image is None:
+              return None
+          l_image = getVisibleCoverage( l_image )
+        return l_image
+
+      def getImage( item ):
+        image = { 'source': item['source'], 'fid': item['fid'] }
+        if item.has_key( 'date' ):
+          image['date'] = item['date']
+        if self.latestByFootprint:
+          image['bbox'] = item['bbox']
+        return image
+
+      def buildCatalog( catalog, msgtrans, label ):
+        # Return False if killed
+        if catalog.isBuilt():
+          return True
+        self.messageStatus.emit( msgtrans )
+        timeIni = time.time()
+        if not catalog.build( lambda: self.isKilled ):
+          return False
+        logTime( label, timeIni )
+        return True
+
+      def addImagesItems( items ):
+        # Bounding box inside of extent, the footprint intersects without request of geometry
+        itemsBorder = {}
+        for item in items:
+          if item['inside'] and not self.exactCanvas:
+            images.append( getImage( item ) )
+          elif not self.exactCanvas or isIntersectsCanvas( QgsGeometry.fromRect( item['bbox'] ) ):
+            itemsBorder[ item['fid'] ] = item
+
+        isIntersects = isIntersectsCanvas if self.exactCanvas else lambda geom: geom.intersects( rectCanvas )
+        fids = itemsBorder.keys()
+        f = QgsFeature()
+        for id in xrange( 0, len( fids ), self.STEP_BATCH ):
+          if self.isKilled:
+            break
+          fr = QgsFeatureRequest()
+          fr.setFilterFids ( fids[ id : id + self.STEP_BATCH ] )
+          fr.setSubsetOfAttributes( [] )
+          it = self.layer.getFeatures( fr )
+          while it.nextFeature( f ):
+            if isIntersects( f.geometry() ):
+              images.append( getImage( itemsBorder[ f.id() ] ) )
+          it.close()
+        itemsBorder.clear()
+
+      def isLimitProvider():
+        # Filters in Python (selection, exact canvas) or other modes need all rows
+        if self.limitImages is None or self.nameFieldDate is None:
+          return False
+        if selectedImage or self.exactCanvas or self.latestByFootprint or self.visibleCoverage:
+          return False
+        return hasattr( QgsFeatureRequest, 'setLimit' ) and hasattr( QgsFeatureRequest, 'addOrderBy' ) # QGIS 2.14
+
+      def getImagesProvider():
+        # The database uses your spatial index, the geometries are not transferred
+        fr = QgsFeatureRequest()
+        if not self.nameFieldDate is None:
+          expression = getExpressionDate()
+          if not expression is None:
+            fr.setFilterExpression( expression ) # Before rectangle, some versions of QGIS keep only the last filter
+        fr.setFilterRect( rectCanvas )
+        if self.latestByFootprint or self.exactCanvas: # Need the footprint
+          fr.setFlags( QgsFeatureRequest.ExactIntersect )
+        else:
+          fr.setFlags( QgsFeatureRequest.ExactIntersect | QgsFeatureRequest.NoGeometry )
+        fr.setSubsetOfAttributes( getAttributes() )
+        if isLimitProvider():
+          # Only the N most recent rows are fetched, selectImages keeps the same
+          fr.addOrderBy( self.nameFieldDate, False )
+          fr.setLimit( self.limitImages )
+        if self.exactCanvas:
+          populateImages( fr, lambda feat: isIntersectsCanvas( feat.geometry() ) )
+        else:
+          populateImages( fr, lambda feat: True )
+        return ( True, images )
+
+      def queryIndex( rect ):
+        # Images with bounding box intersecting rect, return None if killed
+        msgtrans = QCoreApplication.translate( "CatalogOTF", "Building index..." )
+        if not buildCatalog( self.catalogIndex, msgtrans, "Built index" ):
+          return None
+        fids = self.catalogIndex.intersects( rect, fidsSelected )
+        bboxes = self.catalogIndex.getBBoxes( fids )
+        hasDateRange = not ( self.dateFrom is None and self.dateTo is None )
+        getF = getSourceDate if not self.nameFieldDate  is None else  getSource
+        attributes = getAttributes()
+        items = []
+        f = QgsFeature()
+        for id in xrange( 0, len( fids ), self.STEP_BATCH ):
+          if self.isKilled:
+            return None
+          fr = QgsFeatureRequest()
+          fr.setFilterFids ( fids[ id : id + self.STEP_BATCH ] )
+          fr.setSubsetOfAttributes( attributes )
+          fr.setFlags( QgsFeatureRequest.NoGeometry )
+          it = self.layer.getFeatures( fr )
+          while it.nextFeature( f ):
+            if not f.id() in bboxes:
+              continue
+            item = getF( f )
+            item['fid'] = f.id()
+            if hasDateRange and not isDateInRange( item ):
+              continue
+            item['bbox'] = bboxes[ f.id() ]
+            items.append( item )
+          it.close()
+        return items
+
+      def queryArrays( rect ):
+        msgtrans = QCoreApplication.translate( "CatalogOTF", "Building arrays..." )
+        if not buildCatalog( self.catalogArrays, msgtrans, "Built arrays" ):
+          return None
+        return self.catalogArrays.query( rect, dateFrom, dateTo, fidsSelected )
+
+      def getImagesQuery():
+        # Without cache of results, the extent is searched by engine
+        isArrays = self.engine == 'arrays' and CatalogArrays.isAvailable()
+        items = queryArrays( rectCanvas ) if isArrays else queryIndex( rectCanvas )
+        if items is None: # Killed
+          return ( True, images )
+        numImages = len( items )
+        for item in items:
+          item['inside'] = rectCanvas.contains( item['bbox'] )
+        addImagesItems( items )
+        del items[:]
+
+        return ( True, images ) if len( images ) > 0 else ( False, numImages )
+
+      def getImagesTiles():
+        # Only the tiles of extent not in cache are searched (one request for all), see CatalogResults
+        keySelected = None if fidsSelected is None else ( len( fidsSelected ), hash( frozenset( fidsSelected ) ) )
+        isArrays = self.engine == 'arrays' and CatalogArrays.isAvailable() # Dates are strings by arrays
+        keyFilter = ( isArrays, keySelected, self.nameFieldSource, self.nameFieldDate, dateFrom, dateTo )
+        tiles = CatalogResults.getTiles( rectCanvas )
+        generation = self.catalogResults.getGeneration()
+        tileImages = self.catalogResults.get( keyFilter, tiles )
+        tilesSearch = filter( lambda tile: not tile in tileImages, tiles )
+        if len( tilesSearch ) > 0:
+          rect = CatalogResults.getRectTile( tilesSearch[0] )
+          for tile in tilesSearch[1:]:
+            rect.combineExtentWith( CatalogResults.getRectTile( tile ) )
+          query = queryArrays if isArrays else queryIndex
+          items = query( rect )
+          if items is None: # Killed
+            return ( True, images )
+          tileImagesNew = {}
+          for tile in tilesSearch:
+            rectTile = CatalogResults.getRectTile( tile )
+            tileImagesNew[ tile ] = filter( lambda item: item['bbox'].intersects( rectTile ), items )
+          del items[:]
+          self.catalogResults.put( keyFilter, tileImagesNew, generation )
+          tileImages.update( tileImagesNew )
+        msg = "%s - Tiles: %d cached, %d searched" % ( self.layer.name(), len( tiles ) - len( tilesSearch ), len( tilesSearch ) )
+        self.logMessage( msg, "Catalog OTF", QgsMessageLog.INFO )
+
+        # Images of tiles in extent, the same image can be in many tiles
+        items = {}
+        for l_image in tileImages.itervalues():
+          for item in l_image:
+            bbox = item['bbox']
+            if not item['fid'] in items and bbox.intersects( rectCanvas ):
+              items[ item['fid'] ] = dict( item, inside=rectCanvas.contains( bbox ) )
+        addImagesItems( items.values() )
+        items.clear()
+
+        return ( True, images )
+
+      def logTime( label, timeIni ):
+        # Compare the engines of search
+        msg = "%s - %s: %.3f seconds" % ( self.layer.name(), label, time.time() - timeIni )
+        self.logMessage( msg, "Catalog OTF", QgsMessageLog.INFO )
+
+      def getGeometryCanvas():
+        # Visible polygon of canvas (can be rotated) densified before reproject
+        l_point = []
+        total = self.polygonCanvas.size()
+        for id in range( total ):
+          p1 = self.polygonCanvas.at( id )
+          p2 = self.polygonCanvas.at( ( id + 1 ) % total )
+          for step in range( self.DENSIFY_EDGE ):
+            factor = float( step ) / self.DENSIFY_EDGE
+            point = QgsPoint( p1.x() + factor * ( p2.x() - p1.x() ), p1.y() + factor * ( p2.y() - p1.y() ) )
+            l_point.append( point if self.crsCanvas == crsLayer else ct.transform( point ) )
+        l_point.append( l_point[0] )
+        return QgsGeometry.fromPolygon( [ l_point ] )
+
+      def getPrepared( geom ):
+        if not hasattr( QgsGeometry, 'createGeometryEngine' ): # Before QGIS 2.10
+          return lambda other: geom.intersects( other )
+        engine = QgsGeometry.createGeometryEngine( geom.geometry() )
+        engine.prepareGeometry()
+        return lambda other: not other is None and engine.intersects( other.geometry() )
+
       images = []
 
       selectedImage = self.layer.selectedFeatureCount() > 0
+      fidsSelected = self.layer.selectedFeaturesIds() if selectedImage else None
+      dateFrom = None if self.dateFrom is None else getDateString( self.dateFrom )
+      dateTo = None if self.dateTo is None else getDateString( self.dateTo )
       rectLayer = self.layer.extent() if not selectedImage else self.layer.boundingBoxOfSelected()
       crsLayer = self.layer.crs()
 
-      crsCanvas = self.canvas.mapSettings().destinationCrs()
-      ct = QgsCoordinateTransform( crsCanvas, crsLayer )
-      rectCanvas = self.canvas.extent() if crsCanvas == crsLayer else ct.transform( self.canvas.extent() )
+      ct = CacheTransforms.getTransform( self.crsCanvas, crsLayer )
+      rectCanvas = self.extentCanvas if self.crsCanvas == crsLayer else ct.transform( self.extentCanvas )
+
+      if self.exactCanvas:
+        geomCanvas = getGeometryCanvas()
+        isIntersectsCanvas = getPrepared( geomCanvas )
+        rectCanvas = geomCanvas.boundingBox()
 
       if not rectLayer.intersects( rectCanvas ):
         return ( True, images ) 
 
-      fr = QgsFeatureRequest()
-      if selectedImage:
-        fr.setFilterFids( self.layer.selectedFeaturesIds() )
-      index = QgsSpatialIndex( self.layer.getFeatures( fr ) )
-      fids = index.intersects( rectCanvas )
-      del fr
-      del index
-
-      fr = QgsFeatureRequest()
-      fr.setFilterFids ( fids )
-      numImages = len( fids )
-      del fids[:]
-      it = self.layer.getFeatures( fr ) 
-      f = QgsFeature()
-      getF = getSourceDate if not self.nameFieldDate  is None else  getSource
-      while it.nextFeature( f ):
-        if f.geometry().intersects( rectCanvas ):
-          images.append( getF( f ) )
-
-      return ( True, images ) if len( images ) > 0 else ( False, numImages )
+      timeIni = time.time()
+      if self.layer.dataProvider().name() in self.PROVIDERS_PUSHDOWN:
+        ( nameEngine, getImages ) = ( "provider", getImagesProvider )
+      elif not self.catalogResults is None:
+        ( nameEngine, getImages ) = ( "tiles", getImagesTiles )
+      else:
+        nameEngine = "arrays" if self.engine == 'arrays' and CatalogArrays.isAvailable() else "index"
+        getImages = getImagesQuery
+      ( isOk, value ) = getImages()
+      logTime( "Search by %s (%d images)" % ( nameEngine, len( value ) if isOk else 0 ), timeIni )
+      if isOk and ( self.latestByFootprint or not self.limitImages is None or self.visibleCoverage ):
+        value = selectImages( value )
+        if value is None: # Killed
+          value = []
+      return ( isOk, value )
 
     def addImages():
 
@@ -133,81 +565,120 @@ class WorkerPopulateGroup(QObject):
           self.messageStatus.emit( msg )
         self.finished.emit( self.isKilled )
 
-      def getFileInfo( image ):
+      isUrlTMS = WorkerPopulateGroup.isUrlTMS
 
-        def prepareFileTMS( url_tms ):
-
-          def createLocalFile():
-            def populateLocalFile():
-              html = response.read()
-              response.close()
-              fw = open( localName, 'w' )
-              fw.write( html )
-              fw.close()
-
-            isOk = True
-            try:
-              response = urllib2.urlopen( url_tms )
-            except urllib2.HTTPError, e:
-              isOk = False
-            except urllib2.URLError, e:
-              isOk = False
-            #
-            if not isOk:
-              return QFileInfo( url_tms ) # Add for error list
-            else:
-              populateLocalFile()
-              return QFileInfo( localName )
-
-          localName = "%s/%s" % ( self.TEMP_DIR, basename( url_tms ) )
-          fileInfo = QFileInfo( localName )
-          if not fileInfo.exists():
-            fileInfo = createLocalFile()
-
-          return fileInfo
+      def getLocalNameTMS( url_tms ):
+        return self.cacheSources.localName( url_tms )
+
+      def emitProgress( phase, done, total, size, isForced=False ):
+        # Limited rate of signals
+        if not isForced and time.time() - timeProgress[0] < self.PROGRESS_INTERVAL:
+          return
+        timeProgress[0] = time.time()
+        self.progress.emit( phase, done, total, size )
+
+      def fetchFilesTMS():
+        # Download in parallel the TMS not in cache or expired
+        l_urlImage = filter( isUrlTMS, map( lambda item: item['source'], l_image_new ) )
+        self.cacheSources.resetCounters()
+        l_url = filter( lambda item: not self.cacheSources.lookup( item ), l_urlImage )
+        if len( l_url ) > 0:
+          msgtrans = QCoreApplication.translate( "CatalogOTF", "Downloading %d" )
+          self.messageStatus.emit( msgtrans % len( l_url ) )
+          results = self.fetchSources.run( l_url, self.cacheSources.headersRevalidate, progressFetch )
+          del l_url[:]
+          for url, result in results.iteritems():
+            if not result.has_key( 'error' ) and not self.cacheSources.put( url, result, CacheDescriptors.put ):
+              result['error'] = QCoreApplication.translate( "CatalogOTF", "Invalid XML" )
+            if result.has_key( 'error' ):
+              if self.cacheSources.exists( url ): # Use the expired file
+                msgtrans = QCoreApplication.translate( "CatalogOTF", "Using expired cache for %s (%s)" )
+                self.logMessage( msgtrans % ( url, result['error'] ), "Catalog OTF", QgsMessageLog.WARNING )
+              else:
+                l_error.append( "%s (%s)" % ( url, result['error'] ) )
+          results.clear()
+          self.cacheSources.evict( self.filesInUse.union( map( getLocalNameTMS, l_urlImage ) ) )
+
+        msgtrans = QCoreApplication.translate( "CatalogOTF", "Cache of sources: hits %d, misses %d, revalidated %d, evicted %d" )
+        c = self.cacheSources.counters
+        msg = msgtrans % ( c['hits'], c['misses'], c['revalidated'], c['evicted'] )
+        self.logMessage( msg, "Catalog OTF", QgsMessageLog.INFO )
+        del l_urlImage[:]
+
+      def progressFetch( done, total, size ):
+        emitProgress( 'download', done, total, size, done == total )
 
+      def getFileInfo( image ):
         source = image[ 'source' ]
-        isUrl = source.find('http://') == 0 or source.find('https://') == 0
-        lenSource = len( source)
-        isUrl = isUrl and source.rfind( 'xml', lenSource - len( 'xml' ) ) == lenSource - len( 'xml' )   
-        fi = prepareFileTMS( source ) if isUrl else QFileInfo( source )
+        if isUrlTMS( source ):
+          fi = QFileInfo( getLocalNameTMS( source ) )
+          if not fi.exists(): # Error of download
+            return None
+        else:
+          fi = QFileInfo( source )
 
-        dicReturn = { 'fileinfo': fi  }
+        dicReturn = { 'fileinfo': fi, 'source': source, 'name': QFileInfo( source ).baseName() }
         if image.has_key( 'date'):
           dicReturn['date'] = image['date']
 
         return dicReturn
 
-      def getNameLayerDate(id):
-        value = l_fileinfo[ id ]['date']
+      def getNameImage( fi ):
+        if self.nameFieldDate is None:
+          return fi['name']
+        value = fi['date']
         vdate = value.toString( "yyyy-MM-dd" ) if type( value ) is QDate else value
-        name = l_layer[ id ].name()
-        return "%s (%s)" % ( vdate, name )
-
-      def getNameLayer(id):
-        return l_layer[ id ].name()
-
-      def setTransparence():
-
-        def getListTTVP():
-          t = QgsRasterTransparency.TransparentThreeValuePixel()
-          t.red = t.green = t.blue = 0.0
-          t.percentTransparent = 100.0
-          return [ t ]
-        
-        extension = ".xml"
-        l_ttvp = getListTTVP()
-        #
-        for id in range( 0, len( l_raster ) ):
-          fileName = l_fileinfo[ id ]['fileinfo'].fileName()
-          idExt = fileName.rfind( extension )
-          if idExt == -1 or len( fileName ) != ( idExt + len ( extension ) ):
-            l_raster[ id ].renderer().rasterTransparency().setTransparentThreeValuePixelList( l_ttvp )
+        return "%s (%s)" % ( vdate, fi['name'] )
+
+      def openRaster( fi ):
+        # Run in thread of pool, each layer open your own dataset of GDAL
+        timeIni = time.time()
+        layer = QgsRasterLayer( fi['fileinfo'].filePath(), fi['name'] )
+        layer.moveToThread( QCoreApplication.instance().thread() )
+        return ( layer, time.time() - timeIni )
+
+      def logLatency():
+        if len( l_latency ) == 0:
+          return
+        l_slow = filter( lambda item: item[0] >= self.OPEN_SLOW, l_latency )
+        for ( latency, source ) in l_slow:
+          msgtrans = QCoreApplication.translate( "CatalogOTF", "Slow image (%.2f seconds): %s" )
+          self.logMessage( msgtrans % ( latency, source ), "Catalog OTF", QgsMessageLog.WARNING )
+        total = sum( map( lambda item: item[0], l_latency ) )
+        msgtrans = QCoreApplication.translate( "CatalogOTF", "Opened %d images, mean %.2f seconds, slow images %d" )
+        msg = msgtrans % ( len( l_latency ), total / len( l_latency ), len( l_slow ) )
+        self.logMessage( msg, "Catalog OTF", QgsMessageLog.INFO )
+        del l_latency[:]
 
       def cleanLists( lsts ):
         for item in lsts:
           del item[:]
-      
+
+      def removeSources( l_source ):
+        # The nodes are removed by main thread (model of tree), see CatalogOTF.startedDeliveryPG
+        for source in l_source:
+          del self.sourcesCatalog[ source ]
+        l_sourceRemove.extend( l_source )
+
+      def removeImagesOut():
+        sources = set( l_sourceResult )
+        removeSources( filter( lambda item: not item in sources, self.sourcesCatalog.keys() ) )
+
+      def removePlaceholdersTop():
+        # Placeholders between the first images are replaced by layers
+        l_source = filter( lambda item: item in self.sourcesCatalog, l_sourceResult[ : self.lazyTop ] )
+        removeSources( filter( lambda item: self.sourcesCatalog[ item ], l_source ) )
+
+      def deliver( isForced=False ):
+        # Chunk of images (sorted) inserted by main thread, see CatalogOTF.deliveredImages
+        if len( l_chunk ) == 0:
+          return
+        if not isForced and len( l_chunk ) < self.CHUNK_IMAGES and time.time() - timeDeliver[0] < self.CHUNK_INTERVAL:
+          return
+        self.deliveredImages.emit( l_chunk[:] )
+        del l_chunk[:]
+        timeDeliver[0] = time.time()
+
       # Sorted images
       key = 'date' if not self.nameFieldDate is None else 'source'
       f_key = lambda item: item[ key ]  
@@ -218,57 +689,80 @@ class WorkerPopulateGroup(QObject):
         return
       del images[:]
 
-      l_fileinfo = map( getFileInfo, l_image_sorted )
+      # Differential with the images in catalog group
+      l_sourceResult = map( lambda item: item['source'], l_image_sorted )
+      l_sourceRemove = []
+      removeImagesOut()
+      if not self.lazyTop is None:
+        removePlaceholdersTop()
+      l_image_new = filter( lambda item: not item['source'] in self.sourcesCatalog, l_image_sorted )
       del l_image_sorted[:]
+      totalImagesKeep = len( self.sourcesCatalog )
 
-      l_raster = []
       l_error = []
-      l_idRemove = []
-      idRemove = 0
-      for fi in l_fileinfo:
-        layer = QgsRasterLayer( fi['fileinfo'].filePath(), fi['fileinfo'].baseName() )
+      timeProgress = [ 0.0 ]
+      fetchFilesTMS()
+      if self.isKilled:
+        cleanLists( [ l_image_new, l_error, l_sourceResult, l_sourceRemove ] )
+        finished()
+        return
+
+      l_fileinfo = filter( lambda item: not item is None, map( getFileInfo, l_image_new ) )
+      del l_image_new[:]
+      l_fileinfoLazy = []
+      if not self.lazyTop is None:
+        setTop = set( l_sourceResult[ : self.lazyTop ] )
+        l_fileinfoLazy = filter( lambda item: not item['source'] in setTop, l_fileinfo )
+        l_fileinfo = filter( lambda item: item['source'] in setTop, l_fileinfo )
+        setTop.clear()
+
+      # Images are delivered by chunks, the newest are visible while the others are opened
+      self.startedDelivery.emit( l_sourceResult[:], l_sourceRemove[:] )
+      del l_sourceRemove[:]
+      l_chunk = []
+      timeDeliver = [ time.time() ]
+      totalRaster = 0
+      totalOpen = len( l_fileinfo )
+      l_latency = []
+      pool = ThreadPool( self.OPEN_WORKERS )
+      id = 0
+      for ( layer, latency ) in pool.imap( openRaster, l_fileinfo ): # Keep the sorted order
+        l_latency.append( ( latency, layer.source() ) )
         if layer.isValid():
-          l_raster.append( layer )
+          WorkerPopulateGroup.setTransparence( layer )
+          l_chunk.append( { 'source': l_fileinfo[ id ]['source'], 'name': getNameImage( l_fileinfo[ id ] ), 'layer': layer } )
+          totalRaster += 1
         else:
           l_error.append( layer.source() )
           del layer
-          l_idRemove.append( idRemove )
-        idRemove += 1
+        id += 1
+        emitProgress( 'open', id, totalOpen, 0, id == totalOpen )
         if self.isKilled:
-          cleanLists( [ l_fileinfo, l_raster, l_error, l_idRemove ] )
+          pool.terminate()
+          cleanLists( [ l_fileinfo, l_fileinfoLazy, l_chunk, l_error, l_sourceResult, l_latency ] )
           finished()
           return
-      if len( l_idRemove ) > 0:
-        l_idRemove.reverse()
-        for id in l_idRemove:
-          del l_fileinfo[ id ]
-        del l_idRemove[:]
-      # l_fileinfo, l_raster, l_error 
-
-      totalRaster = len( l_raster ) 
-      # Add raster
-      if totalRaster > 0:
-        setTransparence()
-        l_layer = []
-        for item in l_raster:
-          if self.isKilled:
-            break
-          l_layer.append( QgsMapLayerRegistry.instance().addMapLayer( item, addToLegend=False ) )
-        if self.isKilled:
-          cleanLists( [ l_fileinfo, l_raster, l_error, l_layer ] )
-          finished()
-          return
-        del l_raster[:]
-        # l_fileinfo, l_error, l_layer
-        getN = getNameLayer if self.nameFieldDate is None else getNameLayerDate
-        for id in range( 0, len( l_layer ) ):
-          ltl = self.ltgCatalog.addLayer( l_layer[ id ] )
-          ltl.setVisible( Qt.Unchecked )
-          name = getN( id )
-          ltl.setLayerName( name )
-          self.addLegendLayer( l_layer[ id ] )
-        cleanLists( [ l_fileinfo, l_layer ] )
-        # l_error
+        deliver( totalRaster == 1 ) # First image without wait
+      pool.close()
+      pool.join()
+      logLatency()
+      deliver( True )
+
+      totalLazy = len( l_fileinfoLazy )
+      for item in l_fileinfoLazy:
+        l_chunk.append( { 'source': item['source'], 'name': getNameImage( item ), 'placeholder': item['fileinfo'].filePath() } )
+      deliver( True )
+      totalFound = len( l_sourceResult )
+      cleanLists( [ l_fileinfo, l_fileinfoLazy, l_sourceResult ] )
+      # l_error
+
+      self.statistics.emit( {
+        'found': totalFound,
+        'loaded': totalImagesKeep + totalRaster + totalLazy,
+        'errors': len( l_error ),
+        'hits': self.cacheSources.counters['hits'],
+        'duration': time.time() - self.timeRun
+      } )
 
       # Message Error
       if len( l_error) > 0:
@@ -282,12 +776,32 @@ class WorkerPopulateGroup(QObject):
         self.messageError.emit( msg )
         del l_error[:]
 
-      finished( str( totalRaster ) )
+      finished( str( totalImagesKeep + totalRaster + totalLazy ) )
+
+    def fetchPlaceholders():
+      # Files of placeholders removed from cache, the placeholders are materialized by main thread
+      sources = self.sourcesFetch
+      self.sourcesFetch = []
+      msgtrans = QCoreApplication.translate( "CatalogOTF", "Downloading %d" )
+      self.messageStatus.emit( msgtrans % len( sources ) )
+      results = self.fetchSources.run( sources )
+      for url, result in results.iteritems():
+        if not result.has_key( 'error' ):
+          self.cacheSources.put( url, result, CacheDescriptors.put )
+      results.clear()
+      self.fetchedPlaceholders.emit( sources )
+
+    self.timeRun = time.time()
+    self.isKilled = False
+    if len( self.sourcesFetch ) > 0:
+      fetchPlaceholders()
+      if self.isKilled or not self.hasSearch:
+        self.finished.emit( self.isKilled )
+        return
+    self.hasSearch = False
 
     msgtrans = QCoreApplication.translate( "CatalogOTF", "Processing..." )
     self.messageStatus.emit( msgtrans )
-    
-    self.isKilled = False
     ( isOk, value ) = getImagesByCanvas()
     if self.isKilled:
       self.finished.emit( self.isKilled )
@@ -296,9 +810,7 @@ class WorkerPopulateGroup(QObject):
       msgtrans = QCoreApplication.translate( "CatalogOTF", "Total of images(%d) exceeded the query limit." )
       msg = msgtrans % value 
       self.messageError.emit( msg )
-      self.messageStatus.emit( "0" )
-      self.finished.emit( self.isKilled )
-      return
+      value = [] # Remove the images of catalog group
 
     images = value
     msgtrans = QCoreApplication.translate( "CatalogOTF", "Processing %d" )
@@ -309,10 +821,178 @@ class WorkerPopulateGroup(QObject):
   def kill(self):
     self.isKilled = True
     self.sortedImages.kill()
+    self.fetchSources.kill()
+
+
+class WorkerFindCatalogs(QObject):
+
+  # Static
+  FIND_WORKERS = 4
+
+  # Signals 
+  found = pyqtSignal( str, object ) # layer ID, fields of catalog (None if not catalog)
+  finished = pyqtSignal( bool )
+
+  def __init__(self):
+    super(WorkerFindCatalogs, self).__init__()
+    self.layers = {} # Layer ID: layer, not started
+    self.detecting = set() # Layer IDs read by threads of pool
+    self.condition = threading.Condition()
+    self.isKilled = False
+
+  def setData(self, layers):
+    with self.condition:
+      self.layers = dict( map( lambda item: ( item.id(), item ), layers ) )
+
+  def removeLayers(self, layerIds):
+    # Called by main thread before the layers are deleted, waits the threads reading them
+    with self.condition:
+      for layerID in layerIds:
+        self.layers.pop( layerID, None )
+      while len( self.detecting.intersection( layerIds ) ) > 0:
+        self.condition.wait()
+
+  @pyqtSlot()
+  def run(self):
+    def detect( layerID ):
+      # Run in thread of pool, the layers not started are skipped when killed or removed
+      with self.condition:
+        layer = None if self.isKilled else self.layers.pop( layerID, None )
+        if layer is None:
+          return ( layerID, None, False )
+        self.detecting.add( layerID )
+      try:
+        return ( layerID, CatalogOTF.getNameFieldsCatalog( layer ), True )
+      finally:
+        with self.condition:
+          self.detecting.discard( layerID )
+          self.condition.notify_all()
+
+    self.isKilled = False
+    pool = ThreadPool( self.FIND_WORKERS )
+    try:
+      for ( layerID, nameFiedlsCatalog, isDetected ) in pool.imap_unordered( detect, self.layers.keys() ):
+        if isDetected:
+          self.found.emit( layerID, nameFiedlsCatalog )
+    finally: # The dock always receives the finished, also when a detect fails
+      pool.close()
+      pool.join()
+      with self.condition:
+        self.layers = {}
+      self.finished.emit( self.isKilled )
+
+  def kill(self):
+    self.isKilled = True
+
+
+class RunnableWorker(QRunnable):
+
+  def __init__(self, worker):
+    super(RunnableWorker, self).__init__()
+    self.worker = worker
+    self.setAutoDelete( False ) # Kept by SchedulerCatalogOTF
+
+  def run(self):
+    # The scheduler and CatalogOTF always receive the finished, also when the worker fails
+    isFinished = False
+    try:
+      self.worker.run()
+      isFinished = True
+    finally:
+      if not isFinished:
+        self.worker.finished.emit( True )
+
+
+class SchedulerCatalogOTF(QObject):
+  """
+  Searches of all catalogs share a pool with a limited number of threads (idle threads expire).
+  The searches wait in a queue, the catalog clicked by user goes to the head of queue.
+  """
+
+  # Static
+  KEY_SETTINGS = "catalogotf/max_searches"
+  MAX_SEARCHES = 2
+
+  # Signals
+  changedDepth = pyqtSignal( int, int ) # running, queued
+
+  def __init__(self):
+    super(SchedulerCatalogOTF, self).__init__()
+    maxSearches = QSettings().value( self.KEY_SETTINGS, self.MAX_SEARCHES, type=int )
+    self.pool = QThreadPool( self )
+    self.pool.setMaxThreadCount( max( 1, maxSearches ) )
+    self.queue = [] # CatalogOTF
+    self.running = {} # CatalogOTF: RunnableWorker
+
+  def _reportDepth(self):
+    total = len( self.queue )
+    for id in range( total ):
+      self.queue[ id ].queued( id + 1, total )
+    self.changedDepth.emit( len( self.running ), total )
+
+  def _dispatch(self):
+    for cotf in filter( lambda item: not item in self.running, self.queue ):
+      if len( self.running ) >= self.pool.maxThreadCount():
+        break
+      self.queue.remove( cotf )
+      cotf.dispatched()
+      self.running[ cotf ] = RunnableWorker( cotf.worker )
+      self.pool.start( self.running[ cotf ] )
+    self._reportDepth()
+
+  def register(self, cotf):
+    # Before the connections of CatalogOTF, the thread is free when CatalogOTF receive the finished
+    cotf.worker.finished.connect( self._finishedWorker )
+
+  def unregister(self, cotf):
+    # A running worker is kept by your RunnableWorker until the finished
+    self.cancel( cotf )
+    if not cotf in self.running:
+      cotf.worker.finished.disconnect( self._finishedWorker )
+
+  def submit(self, cotf, isPriority=False):
+    if cotf in self.queue:
+      self.queue.remove( cotf )
+    if isPriority:
+      self.queue.insert( 0, cotf )
+    else:
+      self.queue.append( cotf )
+    self._dispatch()
+
+  def cancel(self, cotf):
+    """ Return True if the search was in queue (not started) """
+    if cotf in self.queue:
+      self.queue.remove( cotf )
+      self._reportDepth()
+      return True
+    if cotf in self.running:
+      cotf.worker.kill()
+    return False
+
+  def isQueued(self, cotf):
+    return cotf in self.queue
+
+  def isRunning(self, cotf):
+    return cotf in self.running
+
+  def isActive(self, cotf):
+    return self.isQueued( cotf ) or self.isRunning( cotf )
+
+  @pyqtSlot( bool )
+  def _finishedWorker(self, isKilled):
+    worker = self.sender()
+    for cotf in filter( lambda item: self.running[ item ].worker == worker, self.running.keys() ):
+      del self.running[ cotf ]
+    self._dispatch()
 
 
 class CatalogOTF(QObject):
-  
+
+  # Static
+  DELAY_AUTORUN = 500 # Milliseconds without change of extent before search
+  SAMPLE_DETECT = 10 # Features for detect the fields of catalog
+  KEY_PROJECT_DETECT = ( "catalogotf", "/detect" )
+
   # Signals 
   settedLayer = pyqtSignal( "QgsVectorLayer")
   removedLayer = pyqtSignal( str )
@@ -320,8 +1000,10 @@ class CatalogOTF(QObject):
   changedNameLayer = pyqtSignal( str, str )
   changedTotal = pyqtSignal( str, str )
   changedIconRun = pyqtSignal( str, bool )
+  changedProgress = pyqtSignal( str, str, int, int, int )
+  changedStatistics = pyqtSignal( str, dict )
 
-  def __init__(self, iface, tableCOTF):
+  def __init__(self, iface, tableCOTF, scheduler):
     
     def connecTableCOTF():
       self.settedLayer.connect( tableCOTF.insertRow )
@@ -329,6 +1011,8 @@ class CatalogOTF(QObject):
       self.changedNameLayer.connect( tableCOTF.changedNameLayer )
       self.changedTotal.connect( tableCOTF.changedTotal )
       self.changedIconRun.connect( tableCOTF.changedIconRun )
+      self.changedProgress.connect( tableCOTF.changedProgress )
+      self.changedStatistics.connect( tableCOTF.changedStatistics )
       self.killed.connect( tableCOTF.killed )
 
     super(CatalogOTF, self).__init__()
@@ -340,40 +1024,63 @@ class CatalogOTF(QObject):
     self.msgBar = iface.messageBar()
     self.legendTMS = LegendTMS( 'Catalog OTF' )
     self.legendRaster = LegendRaster( 'Catalog OTF' )
+    self.catalogIndex = CatalogIndex()
+    self.catalogArrays = CatalogArrays()
+    self.catalogResults = CatalogResults()
+    self.scheduler = scheduler
+    self.timerAutoRun = QTimer( self )
+    self.timerAutoRun.setSingleShot( True )
+    self.timerAutoRun.setInterval( self.DELAY_AUTORUN )
+    self.timerAutoRun.timeout.connect( self.autoRun )
 
     self._initThread()
 
     connecTableCOTF()
     self.model.dataChanged.connect( self.dataChanged )
+    self.ltgRoot.visibilityChanged.connect( self.visibilityChanged ) # Placeholder checked
     QgsMapLayerRegistry.instance().layersWillBeRemoved.connect( self.layersWillBeRemoved ) # Catalog layer removed
 
     self.layer = self.layerName = self.nameFieldSource = self.nameFieldDate = None
-    self.ltgCatalog = self.ltgCatalogName = self.visibleSourceLayers = self.hasCanceled = None
+    self.ltgCatalog = self.ltgCatalogName = self.hasCanceled = None
+    self.isAutoRun = self.hasPendingRun = False
+    self.lazyTop = QSettings().value( "catalogotf/lazy_top", 0, type=int ) or None # None: all images are layers
+    self.sourcesMaterialize = []
+    self.sourcesFetched = set() # Placeholders downloaded again by worker, see materializePlaceholders
+    self.rankSources = {} # Source: position in result of search
+    self.dateFrom = self.dateTo = None # QDate
+    self.limitImages = None # Most recent N images
+    self.latestByFootprint = False # Most recent image by footprint
+    self.visibleCoverage = False # Only images not hidden by newer images
+    self.exactCanvas = False # Visible polygon of canvas instead of your extent
+    self.engine = 'index' # Search of local catalogs: 'index' (QgsSpatialIndex) or 'arrays' (NumPy)
 
   def __del__(self):
+    self.setAutoRun( False )
     self._finishThread()
     del self.legendTMS
     del self.legendRaster
+    self.ltgRoot.visibilityChanged.disconnect( self.visibilityChanged )
     QgsMapLayerRegistry.instance().layersWillBeRemoved.disconnect( self.layersWillBeRemoved ) # Catalog layer removed
 
   def _initThread(self):
-    self.thread = QThread( self )
-    self.thread.setObjectName( "QGIS_Plugin_%s" % NAME_PLUGIN.replace( ' ', '_' ) )
-    self.worker = WorkerPopulateGroup( self.addLegendLayerWorker )
-    self.worker.moveToThread( self.thread )
+    # The worker lives in main thread, your run is called by a thread of scheduler
+    self.worker = WorkerPopulateGroup()
+    self.scheduler.register( self )
     self._connectWorker()
 
   def _finishThread(self):
     self._connectWorker( False )
-    self.worker.deleteLater()
-    self.thread.wait()
-    self.thread.deleteLater()
-    self.thread = self.worker = None
+    self.scheduler.unregister( self )
+    self.worker = None
 
   def _connectWorker(self, isConnect = True):
     ss = [
-      { 'signal': self.thread.started, 'slot': self.worker.run },
       { 'signal': self.worker.finished, 'slot': self.finishedPG },
+      { 'signal': self.worker.startedDelivery, 'slot': self.startedDeliveryPG },
+      { 'signal': self.worker.deliveredImages, 'slot': self.deliveredImagesPG },
+      { 'signal': self.worker.progress, 'slot': self.progressPG },
+      { 'signal': self.worker.fetchedPlaceholders, 'slot': self.fetchedPlaceholdersPG },
+      { 'signal': self.worker.statistics, 'slot': self.statisticsPG },
       { 'signal': self.worker.messageStatus, 'slot': self.messageStatusPG },
       { 'signal': self.worker.messageError, 'slot': self.messageErrorPG }
     ]
@@ -385,26 +1092,30 @@ class CatalogOTF(QObject):
         item['signal'].disconnect( item['slot'] )
 
   def addLegendLayerWorker(self, layer):
-    if layer.type() == QgsMapLayer.RasterLayer:  
-      metadata = layer.metadata()
-      if metadata.find( "GDAL provider" ) != -1:
-        if  metadata.find( "OGC Web Map Service" ) != -1:
-          if self.legendTMS.hasTargetWindows( layer ):
-            self.legendTMS.setLayer( layer )
-        else:
-          self.legendRaster.setLayer( layer )
+    # Descriptor of GDAL_WMS is parsed once (see CacheDescriptors), other images are not read
+    if layer.type() == QgsMapLayer.RasterLayer and layer.providerType() == 'gdal':
+      descriptor = CacheDescriptors.get( layer.source() )
+      if not descriptor is None:
+        if not descriptor['targetWindow'] is None:
+          self.legendTMS.setLayer( layer )
+      else:
+        self.legendRaster.setLayer( layer )
 
   def run(self):
     self.hasCanceled = False # Check in finishedPG
 
-    if self.thread.isRunning():
-      self.worker.kill()
+    if self.scheduler.isActive( self ):
       self.hasCanceled = True
+      self.hasPendingRun = False
       msgtrans = QCoreApplication.translate("CatalogOTF", "Canceled search for image from layer %s")
       msg = msgtrans % self.layerName  
       self.msgBar.pushMessage( NAME_PLUGIN, msg, QgsMessageBar.WARNING, 2 )
       self.changedTotal.emit( self.layer.id(), "Canceling processing")
       self.killed.emit( self.layer.id() )
+      del self.sourcesMaterialize[:] # Placeholders checked are not materialized
+      if self.scheduler.cancel( self ): # Not started
+        self.worker.setFetch( [] )
+        self.finishedPG( True )
       return
 
     if self.layer is None:
@@ -412,42 +1123,136 @@ class CatalogOTF(QObject):
       self.msgBar.pushMessage( NAME_PLUGIN, msgtrans, QgsMessageBar.WARNING, 2 )
       return
 
-    self._setGroupCatalog()
-    self.ltgCatalogName = self.ltgCatalog.name()
+    self._runSearch( True )
 
-    renderFlag = self.canvas.renderFlag()
-    if renderFlag:
-      self.canvas.setRenderFlag( False )
-      self.canvas.stopRendering()
-
-    self._populateGroupCatalog()
+  def setAutoRun(self, isAutoRun):
+    if self.isAutoRun == isAutoRun:
+      return
+    self.isAutoRun = isAutoRun
+    if isAutoRun:
+      self.canvas.extentsChanged.connect( self.timerAutoRun.start )
+      self.timerAutoRun.start()
+    else:
+      self.canvas.extentsChanged.disconnect( self.timerAutoRun.start )
+      self.timerAutoRun.stop()
+      self.hasPendingRun = False
 
-    if renderFlag:
-      self.canvas.setRenderFlag( True )
-      self.canvas.refresh()
+  @pyqtSlot()
+  def autoRun(self):
+    if self.layer is None:
+      return
+    if self.scheduler.isRunning( self ):
+      # Cancel the search of old extent, finishedPG restart with the newest extent
+      self.worker.kill()
+      self.hasPendingRun = True
+      return
+    self.hasCanceled = False
+    self._runSearch() # In queue, the data is updated with the newest extent
+
+  def setDateRange(self, dateFrom, dateTo):
+    # None for open range, need the field of date
+    ( self.dateFrom, self.dateTo ) = ( dateFrom, dateTo )
+
+  def setQueryMode(self, limitImages, latestByFootprint, visibleCoverage=False):
+    # Most recent N images (None for all) and/or most recent image by footprint and/or visible images
+    # Need the field of date
+    if self.nameFieldDate is None:
+      ( limitImages, latestByFootprint, visibleCoverage ) = ( None, False, False )
+    self.limitImages = limitImages if not limitImages is None and limitImages > 0 else None
+    self.latestByFootprint = latestByFootprint
+    self.visibleCoverage = visibleCoverage
+
+  def setExactCanvas(self, exactCanvas):
+    self.exactCanvas = exactCanvas
+
+  def setEngine(self, engine):
+    # Catalogs of database always use the provider
+    self.engine = engine if engine == 'index' or CatalogArrays.isAvailable() else 'index'
+
+  def setLazyTop(self, lazyTop):
+    # Only the first images are layers, the others are placeholders until checked
+    self.lazyTop = lazyTop if lazyTop > 0 else None
+
+  def queued(self, position, total):
+    if not self.layer is None:
+      msgtrans = QCoreApplication.translate( "CatalogOTF", "Queued %d of %d" )
+      self.changedTotal.emit( self.layer.id(), msgtrans % ( position, total ) )
 
-  def _populateGroupCatalog(self):
+  def _runSearch(self, isPriority=False):
+    self._setGroupCatalog()
+    self.ltgCatalogName = self.ltgCatalog.name()
+    self._populateGroupCatalog( isPriority ) # Search runs in thread, the render of canvas goes on
 
-    def getSourceVisibleLayers():
-      def hasVisibleRaster( ltl ):
-        return ltl.isVisible() == Qt.Checked and ltl.layer().type() == QgsMapLayer.RasterLayer
-      l_ltlVisible = filter( lambda item: hasVisibleRaster( item ), self.ltgCatalog.findLayers() )
-      return map( lambda item: item.layer().source(),  l_ltlVisible )
+  def _populateGroupCatalog(self, isPriority):
 
     def runWorker():
       data = {}
       data['nameFieldDate'] = self.nameFieldDate
       data['nameFieldSource'] = self.nameFieldSource
       data['layer'] = self.layer
-      data['ltgCatalog'] = self.ltgCatalog
+      data['catalogIndex'] = self.catalogIndex
+      data['catalogArrays'] = self.catalogArrays
+      data['catalogResults'] = self.catalogResults if WorkerPopulateGroup.isCacheResults() else None
+      data['engine'] = self.engine
+      data['lazyTop'] = self.lazyTop
+      data['dateFrom'] = self.dateFrom
+      data['dateTo'] = self.dateTo
+      data['limitImages'] = self.limitImages
+      data['latestByFootprint'] = self.latestByFootprint
+      data['exactCanvas'] = self.exactCanvas
+      data['visibleCoverage'] = self.visibleCoverage
+      data['polygonCanvas'] = self.canvas.mapSettings().visiblePolygon()
+      data['extentCanvas'] = self.canvas.extent()
+      data['crsCanvas'] = self.canvas.mapSettings().destinationCrs()
       self.worker.setData( data )
-      self.thread.start()
+      self.scheduler.submit( self, isPriority )
       #self.worker.run() # DEBUG
 
-    self.visibleSourceLayers = getSourceVisibleLayers()
-    self.ltgCatalog.removeAllChildren()
     runWorker() # See finishPG
 
+  def getSourcesCatalog(self):
+    # Source: is placeholder, the worker not access the nodes
+    sources = {}
+    for node in self.ltgCatalog.children():
+      source = self.getSourceNode( node )
+      if not source is None:
+        sources[ source ] = node.nodeType() == QgsLayerTreeNode.NodeGroup
+    return sources
+
+  def dispatched(self):
+    # Called by scheduler when the search leaves the queue, the catalog group can be changed while queued
+    self._setGroupCatalog()
+    self.worker.setSourcesCatalog( self.getSourcesCatalog(), self.getFilesInUse() )
+
+  @staticmethod
+  def getFilesInUse():
+    # Files of raster layers and placeholders of all catalog groups
+    def addPlaceholders( group ):
+      for node in filter( lambda item: item.nodeType() == QgsLayerTreeNode.NodeGroup, group.children() ):
+        fileName = node.customProperty( KEY_PLACEHOLDER_CATALOG )
+        if fileName is None:
+          addPlaceholders( node )
+        else:
+          files.add( fileName )
+
+    files = set()
+    for layer in QgsMapLayerRegistry.instance().mapLayers().itervalues():
+      if layer.type() == QgsMapLayer.RasterLayer and layer.providerType() == 'gdal':
+        files.add( layer.source() )
+    addPlaceholders( QgsProject.instance().layerTreeRoot() )
+    return files
+
+  @staticmethod
+  def getSourceNode(node):
+    # Source of image (layer or placeholder) in catalog group, None for other nodes
+    if node.nodeType() == QgsLayerTreeNode.NodeLayer:
+      if node.layer() is None or node.layer().type() != QgsMapLayer.RasterLayer:
+        return None
+      return node.customProperty( KEY_SOURCE_CATALOG, node.layer().source() )
+    if node.nodeType() == QgsLayerTreeNode.NodeGroup and not node.customProperty( KEY_PLACEHOLDER_CATALOG ) is None:
+      return node.customProperty( KEY_SOURCE_CATALOG )
+    return None
+
   def _setGroupCatalog(self):
     self.ltgCatalogName = "%s - Catalog" % self.layer.name()
     self.ltgCatalog = self.ltgRoot.findGroup( self.ltgCatalogName  )
@@ -456,23 +1261,182 @@ class CatalogOTF(QObject):
 
   @pyqtSlot( bool )
   def finishedPG(self, isKilled ):
-    def setSourceVisibleLayers():
-      l_ltlVisible = filter( lambda item: item.layer().source() in self.visibleSourceLayers, self.ltgCatalog.findLayers() )
-      map( lambda item: item.setVisible( Qt.Checked ),  l_ltlVisible )
-
-    self.thread.quit()
-    
     if not self.layer is None:
       self.changedIconRun.emit( self.layer.id(), self.layer.selectedFeatureCount() > 0 )
       if self.hasCanceled:
         self.changedTotal.emit( self.layer.id(), '0')
+        self.sourcesFetched.clear()
+
+    if self.hasPendingRun:
+      self.hasPendingRun = False
+      if not self.layer is None:
+        self._runSearch()
+        return
+
+    if len( self.sourcesMaterialize ) > 0:
+      self.materializePlaceholders()
+
+  def _materializePlaceholder(self, node):
+    source = node.customProperty( KEY_SOURCE_CATALOG )
+    fileName = node.customProperty( KEY_PLACEHOLDER_CATALOG )
+    layer = QgsRasterLayer( fileName, QFileInfo( source ).baseName() )
+    if not layer.isValid():
+      del layer
+      node.setVisible( Qt.Unchecked )
+      return False
+
+    WorkerPopulateGroup.setTransparence( layer )
+    QgsMapLayerRegistry.instance().addMapLayer( layer, addToLegend=False )
+    pos = self.ltgCatalog.children().index( node )
+    ltl = self.ltgCatalog.insertLayer( pos, layer )
+    ltl.setLayerName( node.name() )
+    ltl.setCustomProperty( KEY_SOURCE_CATALOG, source )
+    ltl.setVisible( Qt.Checked )
+    self.ltgCatalog.removeChildNode( node )
+    self.addLegendLayerWorker( layer )
+    return True
+
+  @pyqtSlot()
+  def materializePlaceholders(self):
+    if self.ltgCatalog is None or self.scheduler.isActive( self ): # Queued or running, see finishedPG
+      return
+    def isRemovedCache( node ):
+      source = node.customProperty( KEY_SOURCE_CATALOG )
+      return WorkerPopulateGroup.isUrlTMS( source ) and not QFileInfo( node.customProperty( KEY_PLACEHOLDER_CATALOG ) ).exists()
+
+    sources = set( self.sourcesMaterialize )
+    del self.sourcesMaterialize[:]
+    f = lambda item: \
+        not item.customProperty( KEY_PLACEHOLDER_CATALOG ) is None and \
+        item.customProperty( KEY_SOURCE_CATALOG ) in sources
+    l_error = []
+    l_fetch = []
+    for node in filter( f, self.ltgCatalog.children() ):
+      source = node.customProperty( KEY_SOURCE_CATALOG )
+      if isRemovedCache( node ) and not source in self.sourcesFetched:
+        l_fetch.append( source ) # Downloaded by worker, materialized by finishedPG
+        continue
+      self.sourcesFetched.discard( source )
+      if not self._materializePlaceholder( node ):
+        l_error.append( source )
+    self.sourcesFetched.clear()
+    if len( l_fetch ) > 0:
+      self.sourcesMaterialize.extend( l_fetch )
+      self.worker.setFetch( l_fetch )
+      self.scheduler.submit( self, True )
+    if len( l_error ) > 0:
+      for item in l_error:
+        msgtrans = QCoreApplication.translate( "CatalogOTF", "Invalid image: %s" )
+        QgsMessageLog.instance().logMessage( msgtrans % item, "Catalog OTF", QgsMessageLog.CRITICAL )
+      msgtrans = QCoreApplication.translate( "CatalogOTF", "Images invalids: %d. See log message" )
+      self.msgBar.pushMessage( NAME_PLUGIN, msgtrans % len( l_error ), QgsMessageBar.CRITICAL, 8 )
+
+  @pyqtSlot( list )
+  def fetchedPlaceholdersPG(self, sources):
+    # Not downloaded (error) are invalid images by materializePlaceholders
+    self.sourcesFetched.update( sources )
+
+  @pyqtSlot( 'QgsLayerTreeNode*', 'Qt::CheckState' )
+  def visibilityChanged(self, node, state):
+    if state == Qt.Unchecked or self.ltgCatalog is None:
+      return
+    if node.customProperty( KEY_PLACEHOLDER_CATALOG ) is None or node.parent() != self.ltgCatalog:
+      return
+    # Change the tree after the signal, the node is removed by materialize
+    self.sourcesMaterialize.append( node.customProperty( KEY_SOURCE_CATALOG ) )
+    QTimer.singleShot( 0, self.materializePlaceholders )
+
+  @pyqtSlot( list, list )
+  def startedDeliveryPG(self, sources, sourcesRemove):
+    # Order of images in catalog group
+    self.rankSources = dict( ( sources[ id ], id ) for id in range( len( sources ) ) )
+    if self.ltgCatalog is None or len( sourcesRemove ) == 0:
+      return
+
+    # Each run of consecutive nodes is removed by one call (one update of model)
+    sourcesRemove = set( sourcesRemove )
+    children = self.ltgCatalog.children()
+    runs = []
+    for id in range( len( children ) ):
+      if not self.getSourceNode( children[ id ] ) in sourcesRemove:
+        continue
+      if len( runs ) > 0 and runs[-1][0] + runs[-1][1] == id:
+        runs[-1][1] += 1
       else:
-        setSourceVisibleLayers()
+        runs.append( [ id, 1 ] )
+    for ( id, count ) in reversed( runs ):
+      self.ltgCatalog.removeChildren( id, count )
+
+  @pyqtSlot( list )
+  def deliveredImagesPG(self, l_item):
+    # Chunk of images (sorted) from worker, each run of nodes in same position is inserted by one call
+    if self.ltgCatalog is None:
+      return
+    l_layer = map( lambda item: item['layer'], filter( lambda item: item.has_key( 'layer' ), l_item ) )
+    if len( l_layer ) > 0:
+      QgsMapLayerRegistry.instance().addMapLayers( l_layer, False )
+
+    getRank = lambda node: self.rankSources.get( node.customProperty( KEY_SOURCE_CATALOG ), -1 )
+    ranks = map( getRank, self.ltgCatalog.children() )
+    runs = [] # [ position, nodes ]
+    for item in l_item:
+      rank = self.rankSources.get( item['source'], len( self.rankSources ) )
+      pos = len( ranks )
+      for id in range( len( ranks ) ):
+        if ranks[ id ] > rank:
+          pos = id
+          break
+      if item.has_key( 'layer' ):
+        node = QgsLayerTreeLayer( item['layer'] )
+        node.setLayerName( item['name'] )
+      else:
+        node = QgsLayerTreeGroup( item['name'] )
+        node.setCustomProperty( KEY_PLACEHOLDER_CATALOG, item['placeholder'] )
+      node.setVisible( Qt.Unchecked )
+      node.setCustomProperty( KEY_SOURCE_CATALOG, item['source'] )
+      if len( runs ) > 0 and runs[-1][0] == pos:
+        runs[-1][1].append( node )
+      else:
+        runs.append( [ pos, [ node ] ] )
+    for ( pos, nodes ) in reversed( runs ): # Positions before are not changed
+      self.ltgCatalog.insertChildNodes( pos, nodes )
+    del runs[:]
+    map( self.addLegendLayerWorker, l_layer )
+
+  @pyqtSlot( str, int, int, int )
+  def progressPG(self, phase, done, total, size):
+    if self.layer is None: # Catalog removed while worker runs
+      return
+    labels = {
+      'download': QCoreApplication.translate( "CatalogOTF", "Downloading" ),
+      'open': QCoreApplication.translate( "CatalogOTF", "Opening" )
+    }
+    self.changedProgress.emit( self.layer.id(), labels.get( phase, phase ), done, total, size )
+
+  @pyqtSlot( dict )
+  def statisticsPG(self, statistics):
+    if self.layer is None:
+      return
+    statistics['index'] = self.getIndexState()
+    self.changedStatistics.emit( self.layer.id(), statistics )
 
-    del self.visibleSourceLayers[:]
+  def getIndexState(self):
+    if self.layer is None:
+      return None
+    if self.layer.dataProvider().name() in WorkerPopulateGroup.PROVIDERS_PUSHDOWN:
+      return QCoreApplication.translate( "CatalogOTF", "Provider" )
+    if self.engine == 'arrays' and CatalogArrays.isAvailable():
+      isBuilt = self.catalogArrays.isBuilt()
+      return QCoreApplication.translate( "CatalogOTF", "Arrays built" ) if isBuilt else \
+             QCoreApplication.translate( "CatalogOTF", "Arrays not built" )
+    isBuilt = self.catalogIndex.isBuilt()
+    return QCoreApplication.translate( "CatalogOTF", "Index built" ) if isBuilt else \
+           QCoreApplication.translate( "CatalogOTF", "Index not built" )
 
   @pyqtSlot( str )
   def messageStatusPG(self, msg):
+    if self.layer is None:
+      return
     self.changedTotal.emit( self.layer.id(), msg  )
 
   @pyqtSlot( str )
@@ -506,61 +1470,58 @@ class CatalogOTF(QObject):
 
   @staticmethod
   def getNameFieldsCatalog(layer):
-
-    def getFirstFeature():
+    """
+    Detect the fields of source and date by a sample of features, can run out of GUI thread.
+    URL is checked only by syntax (without network)
+    """
+    def getSample():
+      l_feature = []
       f = QgsFeature()
       #
       fr = QgsFeatureRequest() # First FID can be 0 or 1 depend of provider type
+      fr.setFlags( QgsFeatureRequest.NoGeometry )
       it = layer.getFeatures( fr )
-      isOk = it.nextFeature( f )
+      while len( l_feature ) < CatalogOTF.SAMPLE_DETECT and it.nextFeature( f ):
+        if f.isValid():
+          l_feature.append( QgsFeature( f ) )
       it.close()
       #
-      if not isOk or not f.isValid():
-        del f
-        return None
-      else:
-        return f
-
-    def hasAddress(feature, nameField):
-
-      def asValidUrl( url):
-        isOk = True
-        try:
-          urllib2.urlopen(url)
-        except urllib2.HTTPError, e:
-          isOk = False
-        except urllib2.URLError, e:
-          isOk = False
-        #
-        return isOk  
-
-      value = feature.attribute( nameField )
-      if value is None or type(value) == QPyNullVariant:
+      return l_feature
+
+    def getValues(nameField):
+      values = map( lambda feature: feature.attribute( nameField ), l_feature )
+      return filter( lambda value: not value is None and type( value ) != QPyNullVariant, values )
+
+    def hasAddress(nameField):
+      def isPath( value ):
+        fileInfo = QFileInfo( value )
+        return fileInfo.isAbsolute() and fileInfo.suffix() != ''
+
+      values = getValues( nameField )
+      if len( values ) == 0:
         return False
 
-      isUrl = value.find('http://') == 0 or value.find('https://') == 0
-      lenSource = len( value )
-      isUrl = isUrl and value.rfind( 'xml', lenSource - len( 'xml' ) ) == lenSource - len( 'xml' )   
-      if isUrl:
-        return asValidUrl( value )
+      l_url = filter( WorkerPopulateGroup.isUrlTMS, values )
+      if len( l_url ) > 0:
+        return len( l_url ) == len( values )
       #
-      fileInfo = QFileInfo( value )
-      return fileInfo.isFile()
-
-    def hasDate(feature, nameField):
-      value = feature.attribute( nameField )
-      if value is None or type(value) == QPyNullVariant:
+      if not all( map( isPath, values ) ):
         return False
-      
-      date = value if type( value) is QDate else QDate.fromString( value, 'yyyy-MM-dd' )
-                
-      return True if date.isValid() else False
+      return QFileInfo( values[0] ).isFile() # Only one access to disk
+
+    def hasDate(nameField):
+      def isDate( value ):
+        date = value if type( value) is QDate else QDate.fromString( value, 'yyyy-MM-dd' )
+        return date.isValid()
+
+      values = getValues( nameField )
+      return len( values ) > 0 and all( map( isDate, values ) )
 
     if layer is None or layer.type() != QgsMapLayer.VectorLayer or layer.geometryType() != QGis.Polygon:
       return None
 
-    firstFeature = getFirstFeature()
-    if firstFeature is None:
+    l_feature = getSample()
+    if len( l_feature ) == 0:
       return None
 
     fieldSource = None
@@ -569,139 +1530,461 @@ class CatalogOTF(QObject):
     for item in layer.pendingFields().toList():
       nameField = item.name()
       if item.type() == QVariant.String:
-        if fieldSource is None and hasAddress( firstFeature, nameField ):
+        if fieldSource is None and hasAddress( nameField ):
           fieldSource = nameField
-        elif fieldDate is None and hasDate( firstFeature, nameField ):
+        elif fieldDate is None and hasDate( nameField ):
           fieldDate = nameField
       elif item.type() == QVariant.Date:
-        if fieldDate is None and hasDate( firstFeature, nameField ):
+        if fieldDate is None and hasDate( nameField ):
           fieldDate = nameField
     if not fieldSource is None:
       isOk = True
+    del l_feature[:]
 
     return { 'nameSource': fieldSource, 'nameDate': fieldDate } if isOk else None 
 
+  @staticmethod
+  def getSchemaCatalog(layer):
+    # Signature of fields, the detection is done again when changed
+    fields = layer.pendingFields().toList()
+    return ",".join( map( lambda item: "%s:%d" % ( item.name(), item.type() ), fields ) )
+
+  @staticmethod
+  def readDetectCatalogs():
+    # Fields detected by layer ID, saved in project
+    value, ok = QgsProject.instance().readEntry( CatalogOTF.KEY_PROJECT_DETECT[0], CatalogOTF.KEY_PROJECT_DETECT[1] )
+    if not ok or not bool( value ):
+      return {}
+    try:
+      return json.loads( value )
+    except ValueError:
+      return {}
+
+  @staticmethod
+  def writeDetectCatalogs(detects):
+    QgsProject.instance().writeEntry( CatalogOTF.KEY_PROJECT_DETECT[0], CatalogOTF.KEY_PROJECT_DETECT[1], json.dumps( detects ) )
+
+  @staticmethod
+  def getDetectCatalog(detects, layer):
+    """ Return ( isCached, nameFiedlsCatalog ), the cache is valid for same provider URI and schema """
+    item = detects.get( layer.id() )
+    if item is None or item['uri'] != layer.source() or item['schema'] != CatalogOTF.getSchemaCatalog( layer ):
+      return ( False, None )
+    return ( True, item['fields'] )
+
+  @staticmethod
+  def setDetectCatalog(detects, layer, nameFiedlsCatalog):
+    """ Return True if detects changed """
+    item = {
+      'uri': layer.source(),
+      'schema': CatalogOTF.getSchemaCatalog( layer ),
+      'fields': nameFiedlsCatalog
+    }
+    if detects.get( layer.id() ) == item:
+      return False
+    detects[ layer.id() ] = item
+    return True
+
   def setLayerCatalog(self, layer, nameFiedlsCatalog):
     self.layer = layer
     self.layerName = layer.name()
     self.nameFieldSource = nameFiedlsCatalog[ 'nameSource' ]
     self.nameFieldDate = nameFiedlsCatalog[ 'nameDate' ]
+    self.catalogIndex.setLayer( layer )
+    self.catalogArrays.setLayer( layer, self.nameFieldSource, self.nameFieldDate )
+    self.catalogResults.setLayer( layer )
     self.settedLayer.emit( self.layer )
 
   def removeLayerCatalog(self):
+    self.setAutoRun( False )
     self.ltgRoot.removeChildNode( self.ltgCatalog )
     self.ltgCatalog = None
+    self.catalogIndex.removeLayer()
+    self.catalogArrays.removeLayer()
+    self.catalogResults.removeLayer()
     self.layer = self.nameFieldSource = self.nameFieldDate =  None
 
 
+class ModelCatalogOTF(QAbstractTableModel):
+  """
+  Rows of catalogs, the changes are applied by refresh (one dataChanged for rows changed)
+  """
+
+  # Static
+  COLUMNS = ( 'layer', 'total', 'found', 'loaded', 'errors', 'hits', 'duration', 'index', 'auto' )
+  ROLE_ID = Qt.UserRole
+  ROLE_PROGRESS = Qt.UserRole + 1 # ( label, done, total, bytes ) or None
+  ROLE_ENABLED = Qt.UserRole + 2
+  ROLE_SORT = Qt.UserRole + 3
+
+  # Signals
+  changedAuto = pyqtSignal( str, bool )
+
+  def __init__(self, icons):
+    super( ModelCatalogOTF, self ).__init__()
+    self.icons = icons
+    self.items = []
+    self.rows = {} # layerID: row
+    self.dirty = set() # Rows changed
+    msgtrans = QCoreApplication.translate("CatalogOTF", "Layer,Total,Found,Loaded,Errors,Cache hits,Duration,Index,Auto")
+    self.headers = msgtrans.split(',')
+
+  def rowCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else len( self.items )
+
+  def columnCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else len( self.COLUMNS )
+
+  def headerData(self, section, orientation, role=Qt.DisplayRole):
+    if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+      return self.headers[ section ]
+    return None
+
+  def flags(self, index):
+    flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    if self.COLUMNS[ index.column() ] == 'auto':
+      flags |= Qt.ItemIsUserCheckable
+    return flags
+
+  def data(self, index, role=Qt.DisplayRole):
+    if not index.isValid():
+      return None
+    item = self.items[ index.row() ]
+    key = self.COLUMNS[ index.column() ]
+    if role == self.ROLE_ID:
+      return item['id']
+    if key == 'layer':
+      values = {
+        Qt.DisplayRole: item['name'], Qt.ToolTipRole: item['name'],
+        Qt.DecorationRole: self.icons[ item['icon'] ], self.ROLE_ENABLED: item['enabled'],
+        self.ROLE_SORT: item['name'].lower()
+      }
+      return values.get( role )
+    if key == 'total':
+      values = {
+        Qt.DisplayRole: item['total'], Qt.ToolTipRole: item['total'],
+        self.ROLE_PROGRESS: item['progress'], self.ROLE_SORT: item['loaded'] if not item['loaded'] is None else -1
+      }
+      return values.get( role )
+    if key == 'auto':
+      if role == Qt.CheckStateRole:
+        return Qt.Checked if item['auto'] else Qt.Unchecked
+      if role == Qt.ToolTipRole:
+        return QCoreApplication.translate("CatalogOTF", "Search images when the map extent changes")
+      if role == self.ROLE_SORT:
+        return int( item['auto'] )
+      return None
+    value = item[ key ]
+    if role == self.ROLE_SORT:
+      return value if not value is None else -1
+    if role == Qt.DisplayRole and not value is None:
+      return "%.1f s" % value if key == 'duration' else value if key == 'index' else str( value )
+    return None
+
+  def setData(self, index, value, role=Qt.EditRole):
+    if not index.isValid() or self.COLUMNS[ index.column() ] != 'auto' or role != Qt.CheckStateRole:
+      return False
+    item = self.items[ index.row() ]
+    item['auto'] = value == Qt.Checked
+    self.dataChanged.emit( index, index )
+    self.changedAuto.emit( item['id'], item['auto'] )
+    return True
+
+  def insertItem(self, layerID, name, icon):
+    row = len( self.items )
+    self.beginInsertRows( QModelIndex(), row, row )
+    self.items.append( {
+      'id': layerID, 'name': name, 'icon': icon, 'enabled': True, 'auto': False,
+      'total': QCoreApplication.translate("CatalogOTF", "None"), 'progress': None,
+      'found': None, 'loaded': None, 'errors': None, 'hits': None, 'duration': None, 'index': None
+    } )
+    self.rows[ layerID ] = row
+    self.endInsertRows()
+
+  def removeItem(self, layerID):
+    row = self.rows.get( layerID, -1 )
+    if row == -1:
+      return
+    self.beginRemoveRows( QModelIndex(), row, row )
+    del self.items[ row ]
+    del self.rows[ layerID ]
+    for key in filter( lambda item: self.rows[ item ] > row, self.rows.keys() ):
+      self.rows[ key ] -= 1
+    self.dirty = set( map( lambda item: item - 1 if item > row else item, filter( lambda item: item != row, self.dirty ) ) )
+    self.endRemoveRows()
+
+  def update(self, layerID, values):
+    row = self.rows.get( layerID, -1 )
+    if row == -1:
+      return
+    self.items[ row ].update( values )
+    self.dirty.add( row )
+
+  def refresh(self):
+    if len( self.dirty ) == 0:
+      return
+    ( first, last ) = ( min( self.dirty ), max( self.dirty ) )
+    self.dirty.clear()
+    self.dataChanged.emit( self.index( first, 0 ), self.index( last, len( self.COLUMNS ) - 1 ) )
+
+
+class DelegateCatalogOTF(QStyledItemDelegate):
+  """
+  Paint the button of run/cancel (column of layer) and the progress (column of total), without widget by row
+  """
+
+  # Signals
+  clicked = pyqtSignal( str )
+
+  def paint(self, painter, option, index):
+    key = ModelCatalogOTF.COLUMNS[ index.column() ]
+    progress = index.data( ModelCatalogOTF.ROLE_PROGRESS ) if key == 'total' else None
+    if key == 'layer':
+      opt = QStyleOptionButton()
+      opt.rect = option.rect.adjusted( 1, 1, -1, -1 )
+      opt.text = index.data( Qt.DisplayRole )
+      opt.icon = index.data( Qt.DecorationRole )
+      opt.iconSize = QSize( 16, 16 )
+      opt.state = QStyle.State_Raised
+      if index.data( ModelCatalogOTF.ROLE_ENABLED ):
+        opt.state |= QStyle.State_Enabled
+      QApplication.style().drawControl( QStyle.CE_PushButton, opt, painter )
+    elif not progress is None:
+      ( label, done, total, size ) = progress
+      opt = QStyleOptionProgressBar()
+      opt.rect = option.rect.adjusted( 1, 1, -1, -1 )
+      ( opt.minimum, opt.maximum, opt.progress ) = ( 0, total, done )
+      text = "%s %d/%d" % ( label, done, total )
+      opt.text = text if size == 0 else "%s (%d KB)" % ( text, size / 1024 )
+      opt.textVisible = True
+      opt.state = QStyle.State_Enabled
+      QApplication.style().drawControl( QStyle.CE_ProgressBar, opt, painter )
+    else:
+      super( DelegateCatalogOTF, self ).paint( painter, option, index )
+
+  def sizeHint(self, option, index):
+    size = super( DelegateCatalogOTF, self ).sizeHint( option, index )
+    if ModelCatalogOTF.COLUMNS[ index.column() ] == 'layer':
+      size.setWidth( size.width() + 24 ) # Frame of button
+    return size
+
+  def editorEvent(self, event, model, option, index):
+    isClick = ModelCatalogOTF.COLUMNS[ index.column() ] == 'layer' and \
+              event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+    if isClick:
+      if index.data( ModelCatalogOTF.ROLE_ENABLED ):
+        self.clicked.emit( index.data( ModelCatalogOTF.ROLE_ID ) )
+      return True
+    return super( DelegateCatalogOTF, self ).editorEvent( event, model, option, index )
+
+
 class TableCatalogOTF(QObject):
 
+  # Static
+  REFRESH_INTERVAL = 200 # Milliseconds between updates of view
+
   runCatalog = pyqtSignal( str )
+  autoRunCatalog = pyqtSignal( str, bool )
+  queryCatalog = pyqtSignal( str )
 
   def __init__(self):
+    def loadIcons():
+      for name in ( 'check_green', 'check_yellow', 'cancel_red' ):
+        self.icons[ name ] = QIcon( joinPath( dirname(__file__), "%s.svg" % name ) )
+
     def initGui():
-      self.tableWidget.setWindowTitle("Catalog OTF")
-      self.tableWidget.setSortingEnabled( False )
-      msgtrans = QCoreApplication.translate("CatalogOTF", "Layer,Total")
-      headers = msgtrans.split(',')
-      self.tableWidget.setColumnCount( len( headers ) )
-      self.tableWidget.setHorizontalHeaderLabels( headers )
-      self.tableWidget.resizeColumnsToContents()
+      self.proxy.setSourceModel( self.model )
+      self.proxy.setSortRole( ModelCatalogOTF.ROLE_SORT )
+      self.proxy.setFilterKeyColumn( 0 )
+      self.proxy.setFilterCaseSensitivity( Qt.CaseInsensitive )
+      self.proxy.setDynamicSortFilter( True )
+      #
+      self.tableView.setWindowTitle("Catalog OTF")
+      self.tableView.setModel( self.proxy )
+      self.tableView.setItemDelegate( self.delegate )
+      self.tableView.setSortingEnabled( True )
+      self.tableView.sortByColumn( 0, Qt.AscendingOrder )
+      self.tableView.verticalHeader().hide()
+      self.tableView.setSelectionBehavior( QAbstractItemView.SelectRows )
+      self.tableView.setContextMenuPolicy( Qt.CustomContextMenu )
+      self.tableView.customContextMenuRequested.connect( self._onContextMenu )
+      self.tableView.resizeColumnsToContents()
+      #
+      self.leFilter.setPlaceholderText( QCoreApplication.translate("CatalogOTF", "Filter catalogs") )
+      self.leFilter.textChanged.connect( self.proxy.setFilterFixedString )
+      layout = QVBoxLayout( self.widgetTable )
+      layout.setContentsMargins( 0, 0, 0, 0 )
+      layout.addWidget( self.leFilter )
+      layout.addWidget( self.tableView )
+      #
+      self.delegate.clicked.connect( self._onRunCatalog )
+      self.model.changedAuto.connect( self.autoRunCatalog )
 
     super( TableCatalogOTF, self ).__init__()
-    self.tableWidget = QTableWidget()
+    self.icons = {}
+    loadIcons()
+    self.model = ModelCatalogOTF( self.icons )
+    self.proxy = QSortFilterProxyModel( self )
+    self.delegate = DelegateCatalogOTF( self )
+    self.widgetTable = QWidget()
+    self.leFilter = QLineEdit( self.widgetTable )
+    self.tableView = QTableView( self.widgetTable )
+    self.timerRefresh = QTimer( self )
+    self.timerRefresh.setSingleShot( True )
+    self.timerRefresh.setInterval( self.REFRESH_INTERVAL )
+    self.timerRefresh.timeout.connect( self._refresh )
     initGui()
 
-  def _getRowLayerID(self, layerID):
-    for row in range( self.tableWidget.rowCount() ):
-      if layerID == self.tableWidget.cellWidget( row, 0 ).objectName():
-        return row
-    return -1
+  def _getIconRun(self, selected):
+    return 'check_yellow' if selected else 'check_green'
 
-  def _changedText(self, layerID, name, column):
-    row = self._getRowLayerID( layerID )
-    if row != -1:
-      wgt = self.tableWidget.cellWidget( row, column ) if column == 0 else self.tableWidget.item( row, column )
-      wgt.setText( name )
-      wgt.setToolTip( name )
-      self.tableWidget.resizeColumnsToContents()
+  def _update(self, layerID, values):
+    self.model.update( layerID, values )
+    if not self.timerRefresh.isActive():
+      self.timerRefresh.start()
 
   @pyqtSlot()
-  def _onRunCatalog(self):
-    btn = self.sender()
-    icon = QIcon( joinPath( dirname(__file__), 'cancel_red.svg' ) )
-    btn.setIcon( icon )
-    layerID = btn.objectName() 
+  def _refresh(self):
+    self.model.refresh()
+    self.tableView.resizeColumnsToContents()
+
+  @pyqtSlot( str )
+  def _onRunCatalog(self, layerID):
+    self._update( layerID, { 'icon': 'cancel_red' } )
     self.runCatalog.emit( layerID )
 
+  @pyqtSlot( 'QPoint' )
+  def _onContextMenu(self, pos):
+    index = self.tableView.indexAt( pos )
+    if index.isValid():
+      self.queryCatalog.emit( index.data( ModelCatalogOTF.ROLE_ID ) )
+
   @pyqtSlot()  
   def _onSelectionChanged(self):
     layer = self.sender()
-    row = self._getRowLayerID( layer.id() )
-    if row != -1:
-      wgt = self.tableWidget.cellWidget( row, 0 )
-      nameIcon = 'check_green.svg' if layer.selectedFeatureCount() == 0 else 'check_yellow.svg'
-      icon = QIcon( joinPath( dirname(__file__), nameIcon ) )
-      wgt.setIcon( icon )
+    self._update( layer.id(), { 'icon': self._getIconRun( layer.selectedFeatureCount() > 0 ) } )
 
   @pyqtSlot( "QgsVectorLayer")
   def insertRow(self, layer):
-    row = self.tableWidget.rowCount()
-    self.tableWidget.insertRow( row )
-
-    column = 0 # Layer
-    layerName = layer.name()
-    nameIcon = 'check_green.svg' if layer.selectedFeatureCount() == 0 else 'check_yellow.svg'
-    icon = QIcon( joinPath( dirname(__file__), nameIcon ) )
-    btn = QPushButton( icon, layerName, self.tableWidget )
-    btn.setObjectName( layer.id() )
-    btn.setToolTip( layerName )
-    btn.clicked.connect( self._onRunCatalog )
+    self.model.insertItem( layer.id(), layer.name(), self._getIconRun( layer.selectedFeatureCount() > 0 ) )
     layer.selectionChanged.connect( self._onSelectionChanged )
-    self.tableWidget.setCellWidget( row, column, btn )
-
-    column = 1 # Total
-
-    msgtrans = QCoreApplication.translate("CatalogOTF", "None")
-    item = QTableWidgetItem( msgtrans )
-    item.setFlags( Qt.ItemIsSelectable | Qt.ItemIsEnabled )
-    self.tableWidget.setItem( row, column, item )
-
-    self.tableWidget.resizeColumnsToContents()
+    if not self.timerRefresh.isActive(): # Resize
+      self.timerRefresh.start()
 
   @pyqtSlot( str )
   def removeRow(self, layerID):
-    row = self._getRowLayerID( layerID )
-    if row != -1:
-      self.tableWidget.removeRow( row )
+    self.model.removeItem( layerID )
 
   @pyqtSlot( str, str )
   def changedNameLayer(self, layerID, name):
-    self._changedText( layerID, name, 0 )
+    self._update( layerID, { 'name': name } )
 
   @pyqtSlot( str, str )
   def changedTotal(self, layerID, value):
-    self._changedText( layerID, value, 1 )
+    self._update( layerID, { 'total': value, 'progress': None } )
+
+  @pyqtSlot( str, str, int, int, int )
+  def changedProgress(self, layerID, label, done, total, size):
+    self._update( layerID, { 'progress': ( label, done, total, size ) } )
+
+  @pyqtSlot( str, dict )
+  def changedStatistics(self, layerID, statistics):
+    self._update( layerID, statistics )
 
   @pyqtSlot( str, bool )
   def changedIconRun(self, layerID, selected):
-    row = self._getRowLayerID( layerID )
-    if row != -1:
-      btn = self.tableWidget.cellWidget( row, 0 )
-      nameIcon = 'check_green.svg' if not selected else 'check_yellow.svg'
-      icon = QIcon( joinPath( dirname(__file__), nameIcon ) )
-      btn.setIcon( icon )
-      btn.setEnabled( True )
+    self._update( layerID, { 'icon': self._getIconRun( selected ), 'enabled': True } )
 
   @pyqtSlot( str )
   def killed(self, layerID):
-    row = self._getRowLayerID( layerID )
-    if row != -1:
-      btn = self.tableWidget.cellWidget( row, 0 )
-      btn.setEnabled( False )
+    self._update( layerID, { 'enabled': False } )
 
   def widget(self):
-    return self.tableWidget
+    return self.widgetTable
+
+
+class DialogQueryCatalogOTF(QDialog):
+
+  def __init__(self, cotf, parent):
+
+    def setupUi():
+      self.setWindowTitle( QCoreApplication.translate("CatalogOTF", "Query of catalog - %s") % cotf.layerName )
+      layout = QFormLayout( self )
+      #
+      hasDate = not cotf.nameFieldDate is None
+      today = QDate.currentDate()
+      l_date = (
+        ( 'From', QCoreApplication.translate("CatalogOTF", "From date"), cotf.dateFrom ),
+        ( 'To', QCoreApplication.translate("CatalogOTF", "To date"), cotf.dateTo )
+      )
+      for ( key, label, date ) in l_date:
+        ckb = QCheckBox( label, self )
+        ckb.setChecked( not date is None )
+        ckb.setEnabled( hasDate )
+        dte = QDateEdit( today if date is None else date, self )
+        dte.setCalendarPopup( True )
+        dte.setDisplayFormat( "yyyy-MM-dd" )
+        dte.setEnabled( hasDate and not date is None )
+        ckb.toggled.connect( dte.setEnabled )
+        layout.addRow( ckb, dte )
+        self.dateWidgets[ key ] = ( ckb, dte )
+      #
+      self.spbLimit = QSpinBox( self )
+      self.spbLimit.setRange( 0, 1000000 )
+      self.spbLimit.setSpecialValueText( QCoreApplication.translate("CatalogOTF", "All") )
+      self.spbLimit.setValue( 0 if cotf.limitImages is None else cotf.limitImages )
+      self.spbLimit.setEnabled( hasDate ) # Most recent need the field of date
+      layout.addRow( QCoreApplication.translate("CatalogOTF", "Most recent images"), self.spbLimit )
+      #
+      self.ckbFootprint = QCheckBox( QCoreApplication.translate("CatalogOTF", "Most recent image by footprint"), self )
+      self.ckbFootprint.setChecked( cotf.latestByFootprint )
+      self.ckbFootprint.setEnabled( hasDate )
+      layout.addRow( self.ckbFootprint )
+      #
+      self.ckbCoverage = QCheckBox( QCoreApplication.translate("CatalogOTF", "Only visible images (not covered by newer images)"), self )
+      self.ckbCoverage.setChecked( cotf.visibleCoverage )
+      self.ckbCoverage.setEnabled( hasDate )
+      layout.addRow( self.ckbCoverage )
+      #
+      self.ckbExact = QCheckBox( QCoreApplication.translate("CatalogOTF", "Exact area of canvas (rotated or reprojected)"), self )
+      self.ckbExact.setChecked( cotf.exactCanvas )
+      layout.addRow( self.ckbExact )
+      #
+      self.cmbEngine = QComboBox( self )
+      self.cmbEngine.addItem( QCoreApplication.translate("CatalogOTF", "Spatial index"), 'index' )
+      self.cmbEngine.addItem( QCoreApplication.translate("CatalogOTF", "NumPy arrays"), 'arrays' )
+      self.cmbEngine.setCurrentIndex( self.cmbEngine.findData( cotf.engine ) )
+      self.cmbEngine.setEnabled( CatalogArrays.isAvailable() )
+      layout.addRow( QCoreApplication.translate("CatalogOTF", "Search engine"), self.cmbEngine )
+      #
+      self.spbLazyTop = QSpinBox( self )
+      self.spbLazyTop.setRange( 0, 1000000 )
+      self.spbLazyTop.setSpecialValueText( QCoreApplication.translate("CatalogOTF", "All") )
+      self.spbLazyTop.setValue( 0 if cotf.lazyTop is None else cotf.lazyTop )
+      self.spbLazyTop.setToolTip( QCoreApplication.translate("CatalogOTF", "Other images are placeholders until checked") )
+      layout.addRow( QCoreApplication.translate("CatalogOTF", "Layers materialized (first N)"), self.spbLazyTop )
+      #
+      bbox = QDialogButtonBox( QDialogButtonBox.Ok | QDialogButtonBox.Cancel, Qt.Horizontal, self )
+      bbox.accepted.connect( self.accept )
+      bbox.rejected.connect( self.reject )
+      layout.addRow( bbox )
+
+    super( DialogQueryCatalogOTF, self ).__init__( parent )
+    self.cotf = cotf
+    self.dateWidgets = {}
+    setupUi()
+
+  def accept(self):
+    def getDate( key ):
+      ( ckb, dte ) = self.dateWidgets[ key ]
+      return dte.date() if ckb.isChecked() else None
+
+    self.cotf.setDateRange( getDate( 'From' ), getDate( 'To' ) )
+    self.cotf.setQueryMode( self.spbLimit.value(), self.ckbFootprint.isChecked(), self.ckbCoverage.isChecked() )
+    self.cotf.setExactCanvas( self.ckbExact.isChecked() )
+    self.cotf.setEngine( self.cmbEngine.itemData( self.cmbEngine.currentIndex() ) )
+    self.cotf.setLazyTop( self.spbLazyTop.value() )
+    super( DialogQueryCatalogOTF, self ).accept()
 
 
 class DockWidgetCatalogOTF(QDockWidget):
@@ -721,10 +2004,18 @@ class DockWidgetCatalogOTF(QDockWidget):
       gridLayout.addWidget( tbl, iniY, iniX, spanY, spanX )
       #
       msgtrans = QCoreApplication.translate("CatalogOTF", "Find catalog")
-      btnFindCatalogs = QPushButton( msgtrans, wgt )
-      btnFindCatalogs.clicked.connect( self.findCatalogs )
+      self.btnFindCatalogs = QPushButton( msgtrans, wgt )
+      self.btnFindCatalogs.clicked.connect( self.findCatalogs )
       ( iniY, iniX, spanY, spanX ) = ( 1, 0, 1, 1 )
-      gridLayout.addWidget( btnFindCatalogs, iniY, iniX, spanY, spanX )
+      gridLayout.addWidget( self.btnFindCatalogs, iniY, iniX, spanY, spanX )
+      #
+      self.lblFind = QLabel( wgt ) # Progress of find
+      ( iniY, iniX, spanY, spanX ) = ( 1, 1, 1, 1 )
+      gridLayout.addWidget( self.lblFind, iniY, iniX, spanY, spanX )
+      #
+      self.lblDepth = QLabel( wgt ) # Searches of scheduler
+      ( iniY, iniX, spanY, spanX ) = ( 2, 0, 1, 2 )
+      gridLayout.addWidget( self.lblDepth, iniY, iniX, spanY, spanX )
       #
       wgt.setLayout( gridLayout )
       self.setWidget( wgt )
@@ -735,21 +2026,75 @@ class DockWidgetCatalogOTF(QDockWidget):
     self.cotf = {} 
     self.tbl_cotf = TableCatalogOTF()
     self.tbl_cotf.runCatalog.connect( self._onRunCatalog )
+    self.tbl_cotf.autoRunCatalog.connect( self._onAutoRunCatalog )
+    self.tbl_cotf.queryCatalog.connect( self._onQueryCatalog )
+    self.scheduler = SchedulerCatalogOTF()
+    self.iface.mapCanvas().destinationCrsChanged.connect( self._onDestinationCrsChanged )
+    self.scheduler.changedDepth.connect( self._onChangedDepth )
+    self.threadFind = QThread( self )
+    self.workerFind = WorkerFindCatalogs()
+    self.workerFind.moveToThread( self.threadFind )
+    self._connectWorkerFind()
+    QgsMapLayerRegistry.instance().layersWillBeRemoved.connect( self._onLayersWillBeRemoved ) # Layers of find
+    self.detects = {} # See CatalogOTF.readDetectCatalogs
+    self.isChangedDetects = False # Entry of project is written only when changed (project is not dirty)
+    self.totalFind = self.doneFind = self.totalFound = 0
     #
     setupUi()
 
+  def __del__(self):
+    QgsMapLayerRegistry.instance().layersWillBeRemoved.disconnect( self._onLayersWillBeRemoved ) # Layers of find
+
   @pyqtSlot( str )
   def _onRunCatalog(self, layerID):
     if layerID in self.cotf.keys(): # Maybe Never happend
       self.cotf[ layerID ].run()
   
+  @pyqtSlot( str, bool )
+  def _onAutoRunCatalog(self, layerID, isAutoRun):
+    if layerID in self.cotf.keys():
+      self.cotf[ layerID ].setAutoRun( isAutoRun )
+
+  @pyqtSlot()
+  def _onDestinationCrsChanged(self):
+    CacheTransforms.clearExtents() # Entries of old CRS are not used again
+
+  @pyqtSlot( list )
+  def _onLayersWillBeRemoved(self, layerIds):
+    # Direct call, the thread of find is busy in run (a queued call would arrive after the delete)
+    if self.threadFind.isRunning():
+      self.workerFind.removeLayers( layerIds )
+
+  @pyqtSlot( int, int )
+  def _onChangedDepth(self, running, queued):
+    msgtrans = QCoreApplication.translate("CatalogOTF", "Searches: %d running, %d queued")
+    self.lblDepth.setText( msgtrans % ( running, queued ) if running + queued > 0 else "" )
+
+  @pyqtSlot( str )
+  def _onQueryCatalog(self, layerID):
+    if layerID in self.cotf.keys():
+      dlg = DialogQueryCatalogOTF( self.cotf[ layerID ], self.iface.mainWindow() )
+      dlg.exec_()
+
   @pyqtSlot( str )
   def removeLayer(self, layerID):
-    self.cotf[ layerID ].worker.kill()
+    self.scheduler.cancel( self.cotf[ layerID ] )
     del self.cotf[ layerID ]
 
-  @pyqtSlot()
-  def findCatalogs(self):
+  def _connectWorkerFind(self, isConnect = True):
+    ss = [
+      { 'signal': self.threadFind.started, 'slot': self.workerFind.run },
+      { 'signal': self.workerFind.found, 'slot': self.foundCatalog },
+      { 'signal': self.workerFind.finished, 'slot': self.finishedFind }
+    ]
+    if isConnect:
+      for item in ss:
+        item['signal'].connect( item['slot'] )  
+    else:
+      for item in ss:
+        item['signal'].disconnect( item['slot'] )
+
+  def _addCatalog(self, layerID, nameFiedlsCatalog):
     def addLegendImages(layer):
      name = "%s - Catalog" % layer.name()
      ltgCatalog = QgsProject.instance().layerTreeRoot().findGroup( name  )
@@ -757,42 +2102,30 @@ class DockWidgetCatalogOTF(QDockWidget):
       for item in map( lambda item: item.layer(), ltgCatalog.findLayers() ):
         self.cotf[ layerID ].addLegendLayerWorker( item )
 
+    item = QgsMapLayerRegistry.instance().mapLayer( layerID )
+    if nameFiedlsCatalog is None or item is None or layerID in self.cotf.keys(): # Removed while finding
+      return False
+    self.cotf[ layerID ] = CatalogOTF( self.iface, self.tbl_cotf, self.scheduler )
+    self.cotf[ layerID ].removedLayer.connect( self.removeLayer )
+    self.cotf[ layerID ].setLayerCatalog( item, nameFiedlsCatalog ) # Insert table
+    addLegendImages( item )
+    return True
+
+  def _endFind(self):
     def checkTempDir():
-      tempDir = QDir( WorkerPopulateGroup.TEMP_DIR )
+      dirCache = WorkerPopulateGroup.getCacheSources().dirCache
+      tempDir = QDir( dirCache )
       if not tempDir.exists():
         msgtrans1 = QCoreApplication.translate("CatalogOTF", "Created temporary directory '%s' for GDAL_WMS")
         msgtrans2 = QCoreApplication.translate("CatalogOTF", "Not possible create temporary directory '%s' for GDAL_WMS")
-        isOk = tempDir.mkpath( WorkerPopulateGroup.TEMP_DIR )
+        isOk = tempDir.mkpath( dirCache )
         msgtrans = msgtrans1 if isOk else msgtrans2
-        tempDir.setPath( WorkerPopulateGroup.TEMP_DIR )
+        tempDir.setPath( dirCache )
         msg = msgtrans % tempDir.absolutePath()
-        msgBar.pushMessage( NAME_PLUGIN, msg, QpluginNamegsMessageBar.CRITICAL, 5 )
-
-    def overrideCursor():
-      cursor = QApplication.overrideCursor()
-      if cursor is None or cursor == 0:
-          QApplication.setOverrideCursor( QCursor( Qt.WaitCursor ) )
-      elif cursor.shape() != Qt.WaitCursor:
-          QApplication.setOverrideCursor( QCursor( Qt.WaitCursor ) )
+        msgBar.pushMessage( NAME_PLUGIN, msg, QgsMessageBar.CRITICAL, 5 )
 
-    overrideCursor()
-    find = False
-    f = lambda item: \
-        item.type() == QgsMapLayer.VectorLayer and \
-        item.geometryType() == QGis.Polygon and \
-        not item.id() in self.cotf.keys()
-    for item in filter( f, self.iface.legendInterface().layers() ):
-      nameFiedlsCatalog = CatalogOTF.getNameFieldsCatalog( item )
-      if not nameFiedlsCatalog is None:
-        layerID = item.id()
-        self.cotf[ layerID ] = CatalogOTF( self.iface, self.tbl_cotf )
-        self.cotf[ layerID ].removedLayer.connect( self.removeLayer )
-        self.cotf[ layerID ].setLayerCatalog( item, nameFiedlsCatalog ) # Insert table
-        addLegendImages( item )
-        find = True
-    #
     msgBar = self.iface.messageBar()
-    if not find:
+    if self.totalFound == 0:
       f = lambda item: \
           item.type() == QgsMapLayer.VectorLayer and \
           item.geometryType() == QGis.Polygon
@@ -803,71 +2136,135 @@ class DockWidgetCatalogOTF(QDockWidget):
     else:
       checkTempDir()
 
-    QApplication.restoreOverrideCursor()
+  def _setFinding(self, isFinding):
+    msgtrans = QCoreApplication.translate("CatalogOTF", "Cancel find") if isFinding else \
+               QCoreApplication.translate("CatalogOTF", "Find catalog")
+    self.btnFindCatalogs.setText( msgtrans )
+    if not isFinding:
+      self.lblFind.setText( "" )
+
+  @pyqtSlot()
+  def findCatalogs(self):
+    # Layers detected before (same URI and schema) are added now, the others are read by threads and streamed
+    if self.threadFind.isRunning(): # Cancel
+      self.workerFind.kill()
+      return
+    f = lambda item: \
+        item.type() == QgsMapLayer.VectorLayer and \
+        item.geometryType() == QGis.Polygon and \
+        not item.id() in self.cotf.keys()
+    self.detects = CatalogOTF.readDetectCatalogs()
+    self.isChangedDetects = False
+    self.totalFound = 0
+    l_layer = []
+    for item in filter( f, self.iface.legendInterface().layers() ):
+      ( isCached, nameFiedlsCatalog ) = CatalogOTF.getDetectCatalog( self.detects, item )
+      if not isCached:
+        l_layer.append( item )
+      elif self._addCatalog( item.id(), nameFiedlsCatalog ):
+        self.totalFound += 1
+    if len( l_layer ) == 0:
+      self._endFind()
+      return
+
+    ( self.totalFind, self.doneFind ) = ( len( l_layer ), 0 )
+    self._setFinding( True )
+    self.workerFind.setData( l_layer )
+    self.threadFind.start()
+
+  @pyqtSlot( str, object )
+  def foundCatalog(self, layerID, nameFiedlsCatalog):
+    self.doneFind += 1
+    msgtrans = QCoreApplication.translate("CatalogOTF", "Finding catalogs %d/%d...")
+    self.lblFind.setText( msgtrans % ( self.doneFind, self.totalFind ) )
+    layer = QgsMapLayerRegistry.instance().mapLayer( layerID )
+    if layer is None:
+      return
+    if CatalogOTF.setDetectCatalog( self.detects, layer, nameFiedlsCatalog ):
+      self.isChangedDetects = True
+    if self._addCatalog( layerID, nameFiedlsCatalog ):
+      self.totalFound += 1
+
+  @pyqtSlot( bool )
+  def finishedFind(self, isKilled):
+    self.threadFind.quit()
+    self.threadFind.wait()
+    self._setFinding( False )
+    if self.isChangedDetects: # Layers detected before cancel are kept
+      CatalogOTF.writeDetectCatalogs( self.detects )
+    self.detects = {}
+    if isKilled:
+      msgtrans = QCoreApplication.translate("CatalogOTF", "Canceled find of catalogs (%d of %d layers)")
+      self.iface.messageBar().pushMessage( NAME_PLUGIN, msgtrans % ( self.doneFind, self.totalFind ), QgsMessageBar.WARNING, 3 )
+    self._endFind()
 
 
 class ProjectDockWidgetCatalogOTF():
 
   pluginName = "Plugin_DockWidget_Catalog_OTF"
-  pluginSetting = "/images_wms"
+  pluginSetting = "/images_wms" # Previous versions, JSON with content of files
+  pluginSettingZip = "/images_wms_z" # See ProjectDescriptors
   nameTmpDir = "tmp"
 
   def __init__(self, iface):
     self.iface = iface
+    self.descriptors = ProjectDescriptors()
+    self.isRestored = False # By onLayerLoaded
 
-  @pyqtSlot("QDomDocument")
-  def onReadProject(self, document):
-    def createTmpDir():
-      tmpDir = "%s%s" % ( sepPath, self.nameTmpDir )
-      if not isdir( tmpDir ):
-        makedirs( tmpDir )
-
+  def _restoreDescriptors(self):
+    """ Return the number of files written """
     proj = QgsProject.instance()
-    value, ok = proj.readEntry( self.pluginName, self.pluginSetting )
+    value, ok = proj.readEntry( self.pluginName, self.pluginSettingZip )
     if ok and bool( value ):
-      createTmpDir()
-      newImages = 0
-      for item in json.loads( value ):
-        source = item['source']
-        if not QFileInfo( source ).exists():
-          fw = open( source, 'w' )
-          fw.write( item[ 'wms' ] )
-          fw.close()
-          newImages += 1
-      if newImages > 0:
-        msgtrans = QCoreApplication.translate( "CatalogOTF", "Please reopen project - DON'T SAVE. The GDAL_WMS images were regenerated (%d images)" )
-        msg = msgtrans % newImages
-        self.iface.messageBar().pushMessage( NAME_PLUGIN, msg, QgsMessageBar.WARNING, 8 )
+      self.descriptors.decode( value )
+    else:
+      value, ok = proj.readEntry( self.pluginName, self.pluginSetting )
+      if ok and bool( value ):
+        self.descriptors.decodeLegacy( value )
+      else:
+        self.descriptors.clear()
+        return 0
+
+    return self.descriptors.restore() # Entry has only the descriptors of layers when saved
+
+  @pyqtSlot( int, int )
+  def onLayerLoaded(self, i, n):
+    # Emitted with i = 0 before the first layer is read, the entries of project are already read
+    if i != 0:
+      return
+    self._restoreDescriptors()
+    self.isRestored = True
 
   @pyqtSlot("QDomDocument")
-  def onWriteProject(self, document):
-    def getContentFile( source ):
-      with open( source, 'r' ) as content_file:
-        content = content_file.read()
-      return content
+  def onReadProject(self, document):
+    # Project without layers (layerLoaded not emitted), the entry is read for onWriteProject
+    if not self.isRestored:
+      self._restoreDescriptors()
+    self.isRestored = False
 
-    def filter_wms_tmp( layer ):
-      if not layer.type() == QgsMapLayer.RasterLayer:
+  @pyqtSlot("QDomDocument")
+  def onWriteProject(self, document):
+    def isDescriptor( layer ):
+      if not ( layer.type() == QgsMapLayer.RasterLayer and layer.providerType() == "gdal" ):
         return False
 
-      metadata = layer.metadata()
-      if not ( metadata.find( "GDAL provider" ) != -1 and metadata.find( "OGC Web Map Service" ) != -1  ):
-        return False
+      source = layer.source()
+      if not QDir( dirname( source ) ) == QDir( dirCache ):
+        lstDir = dirname( source ).split( sepPath ) # Before the cache of sources
+        if not ( len( lstDir ) == 2 and lstDir[1] == self.nameTmpDir ):
+          return False
 
-      lstDir = dirname( layer.source() ).split( sepPath)
-      if not ( len( lstDir) == 2 and lstDir[1] == self.nameTmpDir ):
-        return False
-      
-      return True
+      # Removed from cache: kept from entry of project
+      return self.descriptors.isStored( source ) or not CacheDescriptors.get( source ) is None
+
+    dirCache = WorkerPopulateGroup.getCacheSources().dirCache
 
     layers = map ( lambda item: item.layer(), self.iface.layerTreeView().layerTreeModel().rootGroup().findLayers() )
-    layers_wms_tmp = filter( filter_wms_tmp, layers )
-    images_wms = []
-    for item in layers_wms_tmp:
-      source = item.source()
-      images_wms.append( { 'source': source, 'wms': getContentFile( source) } )
+    sources = map( lambda item: item.source(), filter( isDescriptor, layers ) )
+    value = self.descriptors.encode( sources )
     proj = QgsProject.instance()
-    if len( images_wms ) == 0:
-      proj.removeEntry( self.pluginName, self.pluginSetting )
+    proj.removeEntry( self.pluginName, self.pluginSetting )
+    if value is None:
+      proj.removeEntry( self.pluginName, self.pluginSettingZip )
     else:
-      proj.writeEntry( self.pluginName, self.pluginSetting, json.dumps( images_wms ) )
+      proj.writeEntry( self.pluginName, self.pluginSettingZip, value )
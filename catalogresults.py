@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Catalog results
+Description          : Results of search of catalog layer by tile of extent
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import math
+from collections import OrderedDict
+
+from PyQt4.QtCore import QMutexLocker
+
+from qgis.core import QgsRectangle
+
+from cataloglayer import CatalogLayer
+
+
+class CatalogResults(CatalogLayer):
+  """
+  Images (fid, source, date and bounding box) with bounding box intersecting the tile, by filters (selection and dates).
+  Tiles are squares with side power of 2 (CRS of layer), then pan and search again use the same tiles.
+  The least recently used tiles are removed, any change in layer clears the results.
+  """
+
+  # Static
+  TILES_BY_SIDE = 4 # Side of tile near of side of extent / TILES_BY_SIDE
+  SIDE_MIN = 1e-9
+  MAX_IMAGES = 200000 # Sum of images of tiles
+
+  def __init__(self):
+    super(CatalogResults, self).__init__()
+    self.tiles = OrderedDict() # ( keyFilter, tile ): list of images, least recently used first
+    self.totalImages = 0
+
+  def getSignalsLayer(self):
+    return [
+      { 'signal': self.layer.featureAdded, 'slot': self.invalidate },
+      { 'signal': self.layer.featureDeleted, 'slot': self.invalidate },
+      { 'signal': self.layer.geometryChanged, 'slot': self.invalidate },
+      { 'signal': self.layer.attributeValueChanged, 'slot': self.invalidate },
+      { 'signal': self.layer.dataChanged, 'slot': self.invalidate },
+      { 'signal': self.layer.afterCommitChanges, 'slot': self.invalidate },
+      { 'signal': self.layer.afterRollBack, 'slot': self.invalidate }
+    ]
+
+  def _clear(self):
+    self.tiles.clear()
+    self.totalImages = 0
+
+  @staticmethod
+  def getTiles(rect):
+    """ Return list of tiles ( level, column, row ) covering rect """
+    side = max( rect.width(), rect.height() ) / CatalogResults.TILES_BY_SIDE
+    level = int( math.ceil( math.log( max( side, CatalogResults.SIDE_MIN ), 2 ) ) )
+    size = 2.0 ** level
+    columns = xrange( int( math.floor( rect.xMinimum() / size ) ), int( math.floor( rect.xMaximum() / size ) ) + 1 )
+    rows = xrange( int( math.floor( rect.yMinimum() / size ) ), int( math.floor( rect.yMaximum() / size ) ) + 1 )
+    return [ ( level, column, row ) for column in columns for row in rows ]
+
+  @staticmethod
+  def getRectTile(tile):
+    ( level, column, row ) = tile
+    size = 2.0 ** level
+    return QgsRectangle( column * size, row * size, ( column + 1 ) * size, ( row + 1 ) * size )
+
+  def get(self, keyFilter, tiles):
+    """ Return dictionary tile: list of images, only the tiles in cache """
+    locker = QMutexLocker( self.mutex )
+    tileImages = {}
+    for tile in tiles:
+      key = ( keyFilter, tile )
+      l_image = self.tiles.pop( key, None )
+      if l_image is None:
+        continue
+      self.tiles[ key ] = l_image # Most recently used
+      tileImages[ tile ] = l_image
+    return tileImages
+
+  def put(self, keyFilter, tileImages, generation):
+    """ tileImages: dictionary tile: list of images. Discarded if the layer changed after generation """
+    locker = QMutexLocker( self.mutex )
+    if generation != self.generation:
+      return
+    for tile, l_image in tileImages.iteritems():
+      key = ( keyFilter, tile )
+      if key in self.tiles:
+        self.totalImages -= len( self.tiles.pop( key ) )
+      self.tiles[ key ] = l_image
+      self.totalImages += len( l_image )
+    while self.totalImages > self.MAX_IMAGES and len( self.tiles ) > 0:
+      ( key, l_image ) = self.tiles.popitem( last=False )
+      self.totalImages -= len( l_image )
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Fetch sources
+Description          : Download of remote sources by pool of threads
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import httplib
+import socket
+import threading
+import Queue
+import urllib
+import base64
+from urlparse import ( urlsplit, urlunsplit, urljoin )
+
+
+class FetchSources(object):
+  """
+  Download the urls with a bounded pool of threads.
+  Each thread keeps one connection alive by host, the connections are closed at end of run.
+  Do not depend of QGIS, can be used with any HTTP server.
+  The proxies are the same of urllib (environment or system), HTTPS is tunneled by CONNECT.
+  """
+
+  # Static
+  MAX_REDIRECTS = 3
+
+  def __init__(self, workers=8, timeoutConnect=5, timeoutRead=30, proxies=None):
+    """ proxies: dictionary scheme: url of proxy ('no': hosts without proxy), None for urllib.getproxies() """
+    ( self.workers, self.timeoutConnect, self.timeoutRead ) = ( workers, timeoutConnect, timeoutRead )
+    self.proxies = urllib.getproxies() if proxies is None else proxies
+    self.isKilled = False
+
+  def _getProxy(self, scheme, netloc):
+    """ Return ( netloc, headers ) of proxy for the url, None for direct connection """
+    proxy = self.proxies.get( scheme )
+    if proxy is None:
+      return None
+    host = urlsplit( "//%s" % netloc ).hostname or ''
+    for name in self.proxies.get( 'no', '' ).split( ',' ): # Like no_proxy: '*', host or domain
+      name = name.strip().lower().lstrip( '.' )
+      if name == '*' or ( name != '' and ( host == name or host.endswith( ".%s" % name ) ) ):
+        return None
+    parts = urlsplit( proxy if '://' in proxy else "http://%s" % proxy )
+    headers = {}
+    if not parts.username is None:
+      auth = "%s:%s" % ( urllib.unquote( parts.username ), urllib.unquote( parts.password or '' ) )
+      headers['Proxy-Authorization'] = "Basic %s" % base64.b64encode( auth )
+    return ( parts.netloc.rsplit( '@', 1 )[-1], headers )
+
+  def _getConnection(self, connections, scheme, netloc):
+    key = ( scheme, netloc )
+    if not key in connections:
+      classConn = httplib.HTTPSConnection if scheme == 'https' else httplib.HTTPConnection
+      proxy = self._getProxy( scheme, netloc )
+      if proxy is None:
+        conn = classConn( netloc, timeout=self.timeoutConnect )
+      else:
+        conn = classConn( proxy[0], timeout=self.timeoutConnect )
+        if scheme == 'https':
+          conn.set_tunnel( netloc, headers=proxy[1] )
+      conn.connect()
+      conn.sock.settimeout( self.timeoutRead )
+      connections[ key ] = conn
+    return connections[ key ]
+
+  def _closeConnection(self, connections, scheme, netloc):
+    key = ( scheme, netloc )
+    if key in connections:
+      connections[ key ].close()
+      del connections[ key ]
+
+  def _request(self, connections, url, headers):
+    """ Return the response already read, reuse of connection need the body consumed """
+    parts = urlsplit( url )
+    path = parts.path if parts.query == '' else "%s?%s" % ( parts.path, parts.query )
+    if path == '':
+      path = '/'
+    proxy = self._getProxy( parts.scheme, parts.netloc )
+    if not proxy is None and parts.scheme == 'http': # Absolute URI to proxy, HTTPS is tunneled
+      path = urlunsplit( ( parts.scheme, parts.netloc, path, '', '' ) )
+      headers = dict( headers, **proxy[1] )
+    for attempt in ( 1, 2 ): # Server can close a connection kept alive, try again with a new
+      isNew = not ( parts.scheme, parts.netloc ) in connections
+      try:
+        conn = self._getConnection( connections, parts.scheme, parts.netloc )
+        conn.request( 'GET', path, headers=headers )
+        response = conn.getresponse()
+        data = response.read()
+      except socket.timeout:
+        self._closeConnection( connections, parts.scheme, parts.netloc )
+        raise
+      except ( httplib.HTTPException, socket.error ):
+        self._closeConnection( connections, parts.scheme, parts.netloc )
+        if isNew or attempt == 2:
+          raise
+        continue
+      if response.getheader( 'connection', '' ).lower() == 'close':
+        self._closeConnection( connections, parts.scheme, parts.netloc )
+      return ( response, data )
+
+  def fetch(self, connections, url, headers=None):
+    """ Return dictionary with 'status', 'headers', 'data' or 'error' """
+    headers = {} if headers is None else dict( headers )
+    headers.setdefault( 'Connection', 'keep-alive' )
+    try:
+      for redirect in range( self.MAX_REDIRECTS + 1 ):
+        ( response, data ) = self._request( connections, url, headers )
+        location = response.getheader( 'location' )
+        if not response.status in ( 301, 302, 303, 307, 308 ) or location is None:
+          break
+        url = urljoin( url, location )
+    except socket.timeout:
+      return { 'error': "Timeout" }
+    except ( httplib.HTTPException, socket.error ) as e:
+      return { 'error': str( e ) or e.__class__.__name__ }
+    result = { 'status': response.status, 'headers': dict( response.getheaders() ), 'data': data }
+    if not response.status in ( 200, 304 ):
+      result['error'] = "HTTP %d %s" % ( response.status, response.reason )
+    return result
+
+  def run(self, urls, headers=None, progress=None):
+    """
+    Return dictionary url: result of fetch
+    headers: function(url) return the headers of request, can be None
+    progress: function(done, total, bytes) called by each url fetched, can be None
+    Urls not fetched when killed are not in dictionary
+    """
+    def worker():
+      connections = {}
+      while not self.isKilled:
+        try:
+          url = queue.get_nowait()
+        except Queue.Empty:
+          break
+        result = self.fetch( connections, url, None if headers is None else headers( url ) )
+        with lock:
+          results[ url ] = result
+          size[0] += len( result.get( 'data', '' ) )
+          if not progress is None:
+            progress( len( results ), total, size[0] )
+      for conn in connections.values():
+        conn.close()
+
+    self.isKilled = False
+    results = {}
+    size = [ 0 ] # Bytes fetched
+    lock = threading.Lock()
+    queue = Queue.Queue()
+    for url in set( urls ):
+      queue.put( url )
+    total = queue.qsize()
+    threads = []
+    for id in range( min( self.workers, queue.qsize() ) ):
+      thread = threading.Thread( target=worker )
+      thread.daemon = True
+      thread.start()
+      threads.append( thread )
+    for thread in threads:
+      thread.join()
+
+    return results
+
+  def kill(self):
+    self.isKilled = True
@@ -19,13 +19,15 @@ email                : motta.luiz@gmail.com
  ***************************************************************************/
 """
 
-from PyQt4.QtCore import ( QObject, QCoreApplication, QTimer, QFile, QIODevice, pyqtSlot )
+from PyQt4.QtCore import ( QCoreApplication, QTimer, pyqtSlot )
 from PyQt4.QtGui  import ( QAction, QColor )
-from PyQt4.QtXml import QDomDocument
 
 import qgis
 from qgis.gui import ( QgsRubberBand ) 
-from qgis.core import ( QGis, QgsMapLayer, QgsRectangle, QgsGeometry, QgsCoordinateTransform, QgsCoordinateReferenceSystem )
+from qgis.core import ( QGis, QgsMapLayer, QgsRectangle, QgsGeometry )
+
+from cachedescriptors import CacheDescriptors
+from cachetransforms import CacheTransforms
 
 class LegendRaster(object):
 
@@ -64,9 +66,7 @@ class LegendRaster(object):
 
   def _getExtent(self, canvas, layer):
     crsCanvas = canvas.mapSettings().destinationCrs()
-    crsLayer = layer.crs()
-    ctCanvas = QgsCoordinateTransform( crsLayer, crsCanvas )
-    return ctCanvas.transform( layer.extent() )
+    return CacheTransforms.getExtent( layer, crsCanvas )
 
   def _highlight(self, canvas, extent ):
     def removeRB():
@@ -102,54 +102,17 @@ class LegendTMS(LegendRaster):
   def __init__(self, parentMenu):
      super(LegendTMS, self).__init__( parentMenu )
 
-  def _getFile(self, layer):
-    doc = QDomDocument()
-    file = QFile( layer.source() )
-    return None if not file.open( QIODevice.ReadOnly ) else file
-
-  def hasTargetWindows(self, layer ):
-    file = self._getFile( layer )
-    if file is None:
-     return False
-
-    doc = QDomDocument()
-    doc.setContent( file )
-    file.close()
-
-    nodes = doc.elementsByTagName( 'TargetWindow' )
-    return True if nodes.count() > 0 else False
+  def _getTargetWindow(self, layer):
+    # ( ulX, ulY, lrX, lrY ) or None, the file is parsed once (see CacheDescriptors)
+    descriptor = CacheDescriptors.get( layer.source() )
+    return None if descriptor is None else descriptor['targetWindow']
 
   def _getExtent(self, canvas, layer):
-    def getTargetWindows():
-      file = self._getFile( layer )
-      if file is None:
-        return None
-
-      doc = QDomDocument()
-      doc.setContent( file )
-      file.close()
-
-      nodes = doc.elementsByTagName( 'TargetWindow' )
-      if nodes.count == 0:
-        return None
-
-      node = nodes.item( 0 )
-      targetWindow = { 'ulX': None, 'ulY': None, 'lrX': None, 'lrY': None }
-      labels = { 'UpperLeftX': 'ulX', 'UpperLeftY': 'ulY', 'LowerRightX': 'lrX', 'LowerRightY': 'lrY' }
-      for key, value in labels.iteritems():
-        text = node.firstChildElement( key ).text()
-        if len( text ) == 0:
-          continue
-        targetWindow[ value ] = float( text )
-
-      if None in targetWindow.values():
-        return None
-
-      return targetWindow
+    tw = self._getTargetWindow( layer )
+    if tw is None: # File changed
+      return super( LegendTMS, self )._getExtent( canvas, layer )
 
     crsCanvas = canvas.mapSettings().destinationCrs()
-    crsLayer = layer.crs()
-    ctCanvas = QgsCoordinateTransform( crsLayer, crsCanvas )
-    tw = getTargetWindows()
-    rect =  QgsRectangle( tw['ulX'], tw['lrY'], tw['lrX'], tw['ulY'] )
-    return ctCanvas.transform( rect )
+    ( ulX, ulY, lrX, lrY ) = tw
+    rect =  QgsRectangle( ulX, lrY, lrX, ulY )
+    return CacheTransforms.getExtent( layer, crsCanvas, rect )
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Project descriptors
+Description          : GDAL_WMS descriptors of layers stored in project by template and compressed
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import re
+import json
+import zlib
+import base64
+
+
+class ProjectDescriptors(object):
+  """
+  Descriptors of the same catalog differ only by ServerUrl, each one is stored as the template
+  (the descriptor without the urls) and the urls. The templates are stored once and the entry of project is compressed.
+  The files are read only when changed (mtime), then saving the project again does not read the files.
+  """
+
+  # Static
+  VERSION = 1
+  MARK_URL = u"\x00" # Not valid in XML, then never inside of descriptor
+  reServerUrl = re.compile( r"(<ServerUrl>)(.*?)(</ServerUrl>)", re.S )
+
+  def __init__(self):
+    self.files = {} # source: ( mtime, template, urls )
+    self.stored = {} # source: ( template, urls ), from entry of project
+
+  @staticmethod
+  def split(content):
+    """ Return ( template, urls ) """
+    if ProjectDescriptors.MARK_URL in content:
+      return ( content, [] )
+    urls = []
+    def sub( match ):
+      urls.append( match.group( 2 ) )
+      return match.group( 1 ) + ProjectDescriptors.MARK_URL + match.group( 3 )
+
+    template = ProjectDescriptors.reServerUrl.sub( sub, content )
+    return ( template, urls )
+
+  @staticmethod
+  def join(template, urls):
+    parts = template.split( ProjectDescriptors.MARK_URL )
+    if len( parts ) != len( urls ) + 1:
+      return None
+    content = [ parts[0] ]
+    for id in xrange( len( urls ) ):
+      content.extend( [ urls[ id ], parts[ id + 1 ] ] )
+    return u"".join( content )
+
+  def clear(self):
+    self.stored = {}
+
+  def isStored(self, source):
+    return source in self.stored
+
+  def _getFile(self, source):
+    """ Return ( mtime, template, urls ) or None, the file is read only if changed """
+    try:
+      mtime = os.stat( source ).st_mtime
+    except OSError:
+      return None
+    item = self.files.get( source )
+    if item is None or item[0] != mtime:
+      try:
+        with open( source, 'r' ) as fr:
+          content = fr.read().decode( 'utf-8' )
+      except ( IOError, UnicodeDecodeError ):
+        return None
+      item = ( mtime, ) + self.split( content )
+      self.files[ source ] = item
+    return item
+
+  def encode(self, sources):
+    """
+    Return the value for entry of project or None if not has descriptors.
+    sources: descriptors of layers in project, the missing files are kept from entry of project
+    """
+    images = {}
+    for source in sources:
+      item = self._getFile( source )
+      if not item is None:
+        images[ source ] = item[1:]
+      elif source in self.stored:
+        images[ source ] = self.stored[ source ]
+    if len( images ) == 0:
+      return None
+
+    ( templates, idTemplates, l_image ) = ( [], {}, [] )
+    for source in sorted( images.keys() ):
+      ( template, urls ) = images[ source ]
+      if not template in idTemplates:
+        idTemplates[ template ] = len( templates )
+        templates.append( template )
+      l_image.append( [ source, idTemplates[ template ], urls ] )
+    data = { 'version': self.VERSION, 'templates': templates, 'images': l_image }
+    return base64.b64encode( zlib.compress( json.dumps( data, separators=( ',', ':' ) ), 9 ) )
+
+  def decode(self, value):
+    """ Read the entry of project, the files are written by restore. Return False if value is invalid """
+    self.stored = {}
+    try:
+      data = json.loads( zlib.decompress( base64.b64decode( value ) ) )
+      templates = data['templates']
+      for ( source, idTemplate, urls ) in data['images']:
+        self.stored[ source ] = ( templates[ idTemplate ], urls )
+    except ( TypeError, ValueError, KeyError, IndexError, zlib.error ):
+      self.stored = {}
+      return False
+    return True
+
+  def decodeLegacy(self, value):
+    """ Entry of previous versions: JSON with list of source and content ('wms') """
+    self.stored = {}
+    try:
+      for item in json.loads( value ):
+        self.stored[ item['source'] ] = self.split( item['wms'] )
+    except ( TypeError, ValueError, KeyError ):
+      self.stored = {}
+      return False
+    return True
+
+  def restore(self, sources=None):
+    """ Write the missing files of sources (None for all stored). Return the number of files written """
+    total = 0
+    for source in self.stored.keys() if sources is None else sources:
+      if not source in self.stored or os.path.exists( source ):
+        continue
+      ( template, urls ) = self.stored[ source ]
+      content = self.join( template, urls )
+      if content is None:
+        continue
+      try:
+        dirSource = os.path.dirname( source )
+        if not os.path.isdir( dirSource ):
+          os.makedirs( dirSource )
+        with open( source, 'w' ) as fw:
+          fw.write( content.encode( 'utf-8' ) )
+        self.files[ source ] = ( os.stat( source ).st_mtime, template, urls )
+      except ( IOError, OSError ):
+        continue
+      total += 1
+    return total
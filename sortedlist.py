@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Sorted list
+Description          : Sort or select the first items of a list, can be canceled
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import heapq
+
+
+class SortedList(object):
+  """
+  Run in the thread of caller (worker thread), kill() can be called from other thread.
+  """
+
+  # Static
+  STEP_KILLED = 10000 # Items between check of killed
+
+  def __init__(self):
+    self.isKilled = False
+
+  def _items(self, lst):
+    for id in xrange( len( lst ) ):
+      if id % self.STEP_KILLED == 0 and self.isKilled:
+        return
+      yield lst[ id ]
+
+  def run(self, lst, key, reverse, top=None):
+    """
+    Return the list sorted, or only the 'top' first items (same result of sorted()[:top])
+    Return None if killed
+    """
+    self.isKilled = False
+    if top is None or top >= len( lst ):
+      l_sorted = sorted( lst, key = key, reverse = reverse )
+    else:
+      selectTop = heapq.nlargest if reverse else heapq.nsmallest
+      l_sorted = selectTop( top, self._items( lst ), key = key )
+
+    return None if self.isKilled else l_sorted
+
+  def kill(self):
+    self.isKilled = True
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Test of cache sources
+Description          : CacheSources in a temporary directory (atomic put, revalidation, TTL and eviction)
+                       Run: python test/test_cachesources.py
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+# The package (__init__) needs QGIS, the module is imported alone
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+from cachesources import CacheSources
+
+
+class TestCacheSources(unittest.TestCase):
+
+  # Static
+  BODY = "<GDAL_WMS><Service name=\"TMS\"><ServerUrl>http://localhost/${z}/${x}/${y}.png</ServerUrl></Service></GDAL_WMS>"
+  ETAG = '"v1"'
+
+  def setUp(self):
+    self.dirCache = tempfile.mkdtemp()
+    self.cache = CacheSources( self.dirCache, ttl=60 )
+
+  def tearDown(self):
+    shutil.rmtree( self.dirCache )
+
+  def getResult(self, status=200, data=None):
+    return { 'status': status, 'headers': { 'etag': self.ETAG }, 'data': self.BODY if data is None else data }
+
+  def test_put(self):
+    url = "http://localhost/image.xml"
+    self.assertFalse( self.cache.put( url, self.getResult( data="<GDAL_WMS>" ) ) ) # Not XML
+    self.assertFalse( self.cache.exists( url ) )
+    self.assertTrue( self.cache.put( url, self.getResult() ) )
+    with open( self.cache.localName( url ), 'r' ) as fr:
+      self.assertEqual( fr.read(), self.BODY )
+    # Only data and sidecar, temporary files are renamed
+    self.assertEqual( len( os.listdir( self.dirCache ) ), 2 )
+    umask = os.umask( 0 )
+    os.umask( umask )
+    self.assertEqual( os.stat( self.cache.localName( url ) ).st_mode & 0777, 0666 & ~umask )
+
+  def test_revalidate(self):
+    url = "http://localhost/image.xml"
+    self.assertIsNone( self.cache.headersRevalidate( url ) )
+    self.cache.put( url, self.getResult() )
+    self.assertEqual( self.cache.headersRevalidate( url ), { 'If-None-Match': self.ETAG } )
+    # Not modified: the file is kept and the time of download is renewed
+    self.assertTrue( self.cache.put( url, self.getResult( 304, "" ) ) )
+    with open( self.cache.localName( url ), 'r' ) as fr:
+      self.assertEqual( fr.read(), self.BODY )
+    self.assertEqual( self.cache.counters['revalidated'], 1 )
+
+  def test_ttl(self):
+    url = "http://localhost/image.xml"
+    self.assertFalse( self.cache.lookup( url ) )
+    self.cache.put( url, self.getResult() )
+    self.assertTrue( self.cache.lookup( url ) )
+    self.cache.ttl = 0
+    time.sleep( 0.01 )
+    self.assertFalse( self.cache.lookup( url ) )
+    self.assertEqual( ( self.cache.counters['hits'], self.cache.counters['misses'] ), ( 1, 2 ) )
+
+  def test_evict(self):
+    urls = map( lambda id: "http://localhost/image_%d.xml" % id, range( 4 ) )
+    for id in range( len( urls ) ):
+      self.cache.put( urls[ id ], self.getResult() )
+      name = self.cache.localName( urls[ id ] )
+      os.utime( name, ( 1000 + id, 1000 + id ) ) # Access time is the order of eviction
+    self.cache.sizeMax = 2 * len( self.BODY )
+    # The oldest is in use (keep), then the next ones are removed
+    self.cache.evict( [ self.cache.localName( urls[0] ) ] )
+    self.assertEqual( map( self.cache.exists, urls ), [ True, False, False, True ] )
+    self.assertFalse( os.path.exists( self.cache._metaName( urls[1] ) ) )
+    self.assertEqual( self.cache.counters['evicted'], 2 )
+
+
+if __name__ == '__main__':
+  unittest.main()
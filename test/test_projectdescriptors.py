@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Test of project descriptors
+Description          : ProjectDescriptors in a temporary directory (encode, decode, restore and legacy entry)
+                       Run: python test/test_projectdescriptors.py
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# The package (__init__) needs QGIS, the module is imported alone
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+from projectdescriptors import ProjectDescriptors
+
+
+class TestProjectDescriptors(unittest.TestCase):
+
+  # Static
+  TEMPLATE = u"<GDAL_WMS><Service name=\"TMS\"><ServerUrl>%s</ServerUrl></Service><Cache/></GDAL_WMS>"
+
+  def setUp(self):
+    self.dirTemp = tempfile.mkdtemp()
+    self.contents = {} # source: content
+    for id in range( 3 ):
+      source = os.path.join( self.dirTemp, "tms", "image_%d.xml" % id )
+      self.contents[ source ] = self.TEMPLATE % ( u"http://localhost/image_%d/${z}/${x}/${y}.png" % id )
+
+  def tearDown(self):
+    shutil.rmtree( self.dirTemp )
+
+  def writeFiles(self):
+    os.makedirs( os.path.join( self.dirTemp, "tms" ) )
+    for source, content in self.contents.iteritems():
+      with open( source, 'w' ) as fw:
+        fw.write( content.encode( 'utf-8' ) )
+
+  def readFile(self, source):
+    with open( source, 'r' ) as fr:
+      return fr.read().decode( 'utf-8' )
+
+  def test_split(self):
+    content = self.contents.values()[0]
+    ( template, urls ) = ProjectDescriptors.split( content )
+    self.assertEqual( len( urls ), 1 )
+    self.assertEqual( ProjectDescriptors.join( template, urls ), content )
+    self.assertIsNone( ProjectDescriptors.join( template, [] ) )
+
+  def test_roundTrip(self):
+    self.writeFiles()
+    sources = self.contents.keys()
+    value = ProjectDescriptors().encode( sources )
+    self.assertEqual( len( json.loads( value.decode( 'base64' ).decode( 'zlib' ) )['templates'] ), 1 ) # Same template
+    shutil.rmtree( os.path.join( self.dirTemp, "tms" ) )
+
+    descriptors = ProjectDescriptors()
+    self.assertTrue( descriptors.decode( value ) )
+    self.assertEqual( descriptors.restore(), len( sources ) )
+    for source in sources:
+      self.assertEqual( self.readFile( source ), self.contents[ source ] )
+    self.assertEqual( descriptors.restore(), 0 ) # Files exist
+    # Missing files are kept from entry of project
+    os.remove( sources[0] )
+    self.assertEqual( descriptors.encode( sources ), value )
+    self.assertFalse( descriptors.decode( "invalid" ) )
+    self.assertFalse( descriptors.isStored( sources[0] ) )
+
+  def test_legacy(self):
+    value = json.dumps( map( lambda source: { 'source': source, 'wms': self.contents[ source ] }, self.contents.keys() ) )
+    descriptors = ProjectDescriptors()
+    self.assertTrue( descriptors.decodeLegacy( value ) )
+    source = self.contents.keys()[0]
+    self.assertEqual( descriptors.restore( [ source ] ), 1 )
+    self.assertEqual( self.readFile( source ), self.contents[ source ] )
+    self.assertFalse( descriptors.decodeLegacy( "[{}]" ) )
+
+
+if __name__ == '__main__':
+  unittest.main()
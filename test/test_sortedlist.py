@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+Name                 : Test of sorted list
+Description          : SortedList with top is the same of sorted()[:top] (ties, reverse and killed)
+                       Run: python test/test_sortedlist.py
+Date                 : October, 2026
+copyright            : (C) 2026 by Luiz Motta
+email                : motta.luiz@gmail.com
+
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import sys
+import random
+import unittest
+
+# The package (__init__) needs QGIS, the module is imported alone
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+from sortedlist import SortedList
+
+
+class TestSortedList(unittest.TestCase):
+
+  def setUp(self):
+    # Many dates are equal, the order of ties is the order of list (like sorted)
+    rnd = random.Random( 1 )
+    self.images = map( lambda id: { 'id': id, 'date': "2026-10-%02d" % rnd.randint( 1, 5 ) }, range( 200 ) )
+    self.key = lambda item: item['date']
+
+  def test_top(self):
+    for reverse in ( False, True ):
+      expected = sorted( self.images, key=self.key, reverse=reverse )
+      for top in ( 1, 7, 50, 199 ):
+        self.assertEqual( SortedList().run( self.images, self.key, reverse, top ), expected[ : top ] )
+
+  def test_all(self):
+    expected = sorted( self.images, key=self.key, reverse=True )
+    self.assertEqual( SortedList().run( self.images, self.key, True ), expected )
+    self.assertEqual( SortedList().run( self.images, self.key, True, 500 ), expected )
+
+  def test_killed(self):
+    sortedList = SortedList()
+    sortedList.STEP_KILLED = 10
+    def key( item ):
+      sortedList.kill() # By other thread
+      return item['date']
+    self.assertIsNone( sortedList.run( self.images, key, True, 10 ) )
+
+
+if __name__ == '__main__':
+  unittest.main()